@@ -0,0 +1,499 @@
+# backend/analysis.py
+#
+# Ядро аналізу: моделі, мікробатчери, кеш результатів і DAG етапів.
+# Спільне для API (backend/api.py) і воркера черги (backend/job_worker.py):
+# воркер імпортує лише його, без FastAPI-застосунку та виконавців API.
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import torch
+from PIL import Image
+
+from backend.src.fusion import fusion
+from backend.src.fusion.fusion import fusion_predict
+from backend.src.models.ai_detector import build_ai_vit, get_vit_cam_layer
+from backend.src.models.face_suppression import face_detect_settings
+from backend.src.models.image_history import SCORE_COLUMNS, ImageHistory
+from backend.src.models.mvss_manip import (
+    MVSS_INPUT_SIZE,
+    get_suppression_mask,
+    load_mvss_model,
+    predict_mvss_batch,
+)
+from backend.src.models.mvss_tiling import get_mvss_cascade, predict_mvss_tiled
+from backend.src.serving import config as serving_config
+from backend.src.serving.batching import MicroBatcher
+from backend.src.serving.early_exit import EarlyExitCascade, fusion_bounds
+from backend.src.serving.executor import configure_torch_threads
+from backend.src.serving.metrics import register_metrics
+from backend.src.serving.onnx_runtime import VIT_ONNX_FILE, backend_name, load_onnx_model, onnx_files
+from backend.src.serving.near_duplicate import NearDuplicateIndex
+from backend.src.serving.pipeline import StageGraph
+from backend.src.serving.result_cache import SOURCE_COMPUTED, ResultCache, fingerprint_version, sha256_hex
+from backend.src.utils.gradcam import ViTGradCAM
+from backend.src.utils.heatmap_codec import pack_result, render_response, strip_heatmaps, unpack_result
+from backend.src.utils.heatmap_store import get_heatmap_store
+from backend.src.utils.helpers import to_tensor
+from backend.src.utils.image_decode import ImageContent, content_digest, decode_rgb
+from backend.src.utils.metadata import analyze_metadata
+from backend.src.utils.phash import phash
+from backend.src.utils.preprocess import ImagePyramid
+
+DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
+MODELS_DIR = "backend/models"
+
+# До завантаження моделей: потім interop-пул torch уже не налаштувати
+configure_torch_threads(serving_config.TORCH_NUM_THREADS, serving_config.TORCH_NUM_INTEROP_THREADS)
+
+
+AI_POS_IDX = 0  # індекс класу "ai_generated"
+
+BASE_DIR = Path(__file__).resolve().parent
+MVSS_MODEL_PATH = BASE_DIR / "thirdparty" / "mvss_net" / "ckpt" / "mvssnetplus_casia.pt"
+mvss_model = load_mvss_model(str(MVSS_MODEL_PATH))
+
+ai_model = build_ai_vit(num_classes=2, pretrained=False, freeze_backbone=False).to(DEVICE)
+try:
+    ai_model.load_state_dict(torch.load(f"{MODELS_DIR}/ai_vit_b16.pt", map_location=DEVICE))
+except FileNotFoundError:
+    print(f"Warning: {MODELS_DIR}/ai_vit_b16.pt not found. AI model will use random weights.")
+
+ai_model.eval()
+ai_cam = ViTGradCAM(ai_model, get_vit_cam_layer(ai_model))
+
+# Оцінки без heatmap — через ONNX Runtime, якщо вибрано (Grad-CAM потребує torch)
+ai_scorer = ai_model
+if serving_config.INFERENCE_BACKEND == "onnx":
+    ai_scorer = load_onnx_model(VIT_ONNX_FILE) or ai_model
+
+
+def run_ai_batch(items: list[tuple[torch.Tensor, bool]]) -> list[tuple[float, Optional[np.ndarray]]]:
+    """
+    Елементи батчу — (тензор 1x3x224x224, чи потрібна heatmap).
+    Для тих, кому потрібна heatmap: один forward/backward ViT + Grad-CAM;
+    для решти — лише forward під inference_mode, без backward.
+    Повертає (ймовірність AI, heatmap або None) для кожного елемента.
+    """
+    results: list = [None] * len(items)
+    cam_idx = [i for i, (_, with_cam) in enumerate(items) if with_cam]
+    score_idx = [i for i, (_, with_cam) in enumerate(items) if not with_cam]
+
+    if cam_idx:
+        x = torch.cat([items[i][0] for i in cam_idx], dim=0)
+        cam, logits = ai_cam(x)
+        probs = torch.softmax(logits.detach(), dim=1)[:, AI_POS_IDX].cpu()
+        cams = cam[:, 0].detach().cpu().numpy()
+        for j, i in enumerate(cam_idx):
+            results[i] = (float(probs[j]), cams[j])
+
+    if score_idx:
+        x = torch.cat([items[i][0] for i in score_idx], dim=0)
+        with torch.inference_mode():
+            probs = torch.softmax(ai_scorer(x), dim=1)[:, AI_POS_IDX].cpu()
+        for j, i in enumerate(score_idx):
+            results[i] = (float(probs[j]), None)
+
+    return results
+
+
+ai_batcher = MicroBatcher(
+    "ai_vit",
+    run_ai_batch,
+    max_batch_size=serving_config.AI_BATCH_MAX_SIZE,
+    max_wait_ms=serving_config.AI_BATCH_MAX_WAIT_MS,
+    workers=serving_config.AI_BATCH_WORKERS,
+)
+
+def run_mvss_batch(items: list[tuple[ImagePyramid, np.ndarray, bool]]) -> list[dict]:
+    """Елементи батчу — (піраміда препроцесингу, маска облич, чи потрібна heatmap)."""
+    results = predict_mvss_batch(mvss_model, [p for p, _, _ in items], [mask for _, mask, _ in items])
+    for res, (_, _, with_heatmap) in zip(results, items):
+        if not with_heatmap:
+            res.pop("manip_heatmap", None)
+            res.pop("patch_heatmap", None)
+    return results
+
+
+def run_mvss_tiled(pyramid: ImagePyramid, face_mask: np.ndarray, with_heatmap: bool) -> dict:
+    """Тайловий режим: батчі тут — тайли одного зображення, а не зображення."""
+    result = predict_mvss_tiled(
+        mvss_model,
+        pyramid.rgb,
+        face_mask,
+        overlap=serving_config.MVSS_TILE_OVERLAP,
+        batch_size=serving_config.MVSS_TILE_BATCH,
+        max_side=serving_config.MVSS_TILE_MAX_SIDE,
+    )
+    if not with_heatmap:
+        result.pop("manip_heatmap", None)
+        result.pop("patch_heatmap", None)
+    return result
+
+
+def run_mvss_cascade(pyramid: ImagePyramid, face_mask: np.ndarray, with_heatmap: bool) -> dict:
+    """Каскад: грубий прохід 512 через мікробатчер, далі уточнення підозрілих тайлів."""
+    coarse = mvss_batcher((pyramid, face_mask, True))
+    result = get_mvss_cascade().refine(mvss_model, pyramid.rgb, coarse["manip_heatmap"], face_mask)
+    if not with_heatmap:
+        result.pop("manip_heatmap", None)
+        result.pop("patch_heatmap", None)
+    return result
+
+
+mvss_batcher = MicroBatcher(
+    "mvss",
+    run_mvss_batch,
+    max_batch_size=serving_config.MVSS_BATCH_MAX_SIZE,
+    max_wait_ms=serving_config.MVSS_BATCH_MAX_WAIT_MS,
+)
+
+# ----- Кеш результатів (ключ: sha256 файлу + версія моделей/fusion) -----
+# Збільшити при зміні формату відповіді analyze_full або препроцесингу
+ANALYSIS_PIPELINE_VERSION = 6
+
+ANALYSIS_VERSION = fingerprint_version(
+    # з ONNX-бекендом — і самі експортовані файли: повторний експорт змінює результати
+    [Path(MODELS_DIR) / "ai_vit_b16.pt", MVSS_MODEL_PATH, *onnx_files(ai_scorer, mvss_model)],
+    extra={
+        "pipeline": ANALYSIS_PIPELINE_VERSION,
+        "mvss_mode": [
+            serving_config.MVSS_MODE,
+            serving_config.MVSS_TILE_MAX_SIDE,
+            serving_config.MVSS_TILE_OVERLAP,
+            serving_config.MVSS_CASCADE_THRESHOLD if serving_config.MVSS_MODE == "cascade" else None,
+        ] if serving_config.MVSS_MODE != "resize" else None,
+        # Маска облич множиться на карту MVSS — впливає на manipulation_score
+        "face_suppression": face_detect_settings(),
+        "early_exit": serving_config.EARLY_EXIT_THRESHOLD if serving_config.EARLY_EXIT_ENABLED else None,
+        "backend": [backend_name(ai_scorer), backend_name(mvss_model)],
+        "fusion": sha256_hex(Path(fusion.__file__).read_bytes()),
+    },
+)
+
+result_cache = ResultCache(
+    "analysis",
+    version=ANALYSIS_VERSION,
+    memory_bytes=serving_config.RESULT_CACHE_MEMORY_MB * 1024 * 1024,
+    disk_path=serving_config.RESULT_CACHE_DB_PATH or None,
+    disk_bytes=serving_config.RESULT_CACHE_DISK_MB * 1024 * 1024,
+    encode=pack_result,
+    decode=unpack_result,
+)
+
+# Перцептивні хеші для пошуку перестиснених / змінених копій
+near_duplicates = NearDuplicateIndex(
+    "analysis",
+    version=ANALYSIS_VERSION,
+    radius=serving_config.NEAR_DUP_RADIUS,
+    disk_path=serving_config.RESULT_CACHE_DB_PATH or None,
+    max_entries=serving_config.NEAR_DUP_MAX_ENTRIES,
+) if serving_config.NEAR_DUP_ENABLED else None
+if near_duplicates is not None:
+    # Хеш без результату в кеші марний — індекс чиститься разом із кешем
+    result_cache.add_evict_listener(near_duplicates.remove)
+
+
+# Режими MVSS для великих зображень (див. MVSS_MODE у serving/config.py)
+MVSS_MODES = ("resize", "tiled", "cascade")
+if serving_config.MVSS_MODE not in MVSS_MODES:
+    raise ValueError(f"Невідомий режим MVSS: {serving_config.MVSS_MODE}")
+
+# Ранній вихід між детекторами (вимкнено за замовчуванням)
+early_exit = EarlyExitCascade(serving_config.EARLY_EXIT_THRESHOLD) if serving_config.EARLY_EXIT_ENABLED else None
+if early_exit is not None:
+    register_metrics("early_exit", early_exit.stats)
+
+# ----- DAG етапів аналізу -----
+# Детектори, EXIF та маска облич незалежні, тому виконуються паралельно;
+# спільні проміжні дані (піраміда ресайзів, тензори, маска облич) рахуються один раз.
+stage_pool = ThreadPoolExecutor(max_workers=serving_config.PIPELINE_WORKERS, thread_name_prefix="stage")
+
+analysis_graph = (
+    StageGraph()
+    .add("pyramid", ImagePyramid, deps=["image"])
+    .add("x_224", lambda p: to_tensor(p, 224), deps=["pyramid"])
+    .add("rgb_512", lambda p: p.level(MVSS_INPUT_SIZE), deps=["pyramid"])
+    .add("gray_512", lambda p: p.gray(MVSS_INPUT_SIZE), deps=["pyramid"])
+    # тензор 512 готується тут, щоб потік мікробатчера MVSS лише склеював батч
+    .add("x_512", lambda p: p.tensor(MVSS_INPUT_SIZE), deps=["pyramid"])
+    .add("face_mask", get_suppression_mask, deps=["rgb_512", "gray_512"])
+    .add("ai", lambda x: ai_batcher((x, True)), deps=["x_224"])
+    .add("ai_scores", lambda x: ai_batcher((x, False)), deps=["x_224"])
+    .add("mvss", lambda p, x_512, face_mask: mvss_batcher((p, face_mask, True)),
+         deps=["pyramid", "x_512", "face_mask"])
+    .add("mvss_scores", lambda p, x_512, face_mask: mvss_batcher((p, face_mask, False)),
+         deps=["pyramid", "x_512", "face_mask"])
+    .add("mvss_tiled", lambda p, face_mask: run_mvss_tiled(p, face_mask, True),
+         deps=["pyramid", "face_mask"])
+    .add("mvss_tiled_scores", lambda p, face_mask: run_mvss_tiled(p, face_mask, False),
+         deps=["pyramid", "face_mask"])
+    .add("mvss_cascade", lambda p, x_512, face_mask: run_mvss_cascade(p, face_mask, True),
+         deps=["pyramid", "x_512", "face_mask"])
+    .add("mvss_cascade_scores", lambda p, x_512, face_mask: run_mvss_cascade(p, face_mask, False),
+         deps=["pyramid", "x_512", "face_mask"])
+    .add("metadata", analyze_metadata, deps=["image"])
+)
+
+
+def decode_image(content: ImageContent) -> Image.Image:
+    """
+    Зменшене декодування: детекторам достатньо сторони MVSS_INPUT_SIZE,
+    тайловий MVSS (tiled / cascade) зменшує довшу сторону до MVSS_TILE_MAX_SIDE
+    (0 — повна роздільність, без зменшення).
+    """
+    max_pixels = int(serving_config.IMAGE_MAX_MEGAPIXELS * 1e6)
+    if serving_config.MVSS_MODE == "resize":
+        return decode_rgb(content, MVSS_INPUT_SIZE, max_pixels)
+    if not serving_config.MVSS_TILE_MAX_SIDE:
+        return decode_rgb(content, 0, max_pixels)
+    return decode_rgb(content, MVSS_INPUT_SIZE, max_pixels, max_side=serving_config.MVSS_TILE_MAX_SIDE)
+
+
+def normalize_map(m: np.ndarray) -> np.ndarray:
+    m = np.array(m)
+    min_v = float(m.min())
+    max_v = float(m.max())
+    denom = max_v - min_v
+    if denom < 1e-8:
+        return np.zeros_like(m, dtype=np.float32)
+    return (m - min_v) / (denom + 1e-8)
+
+
+def analyze_content(content: ImageContent, content_hash: str, mode: str = "full") -> tuple[dict, str]:
+    """Аналіз вмісту файлу через кеш результатів. Повертає (результат, джерело)."""
+    with_heatmaps = mode == "full"
+    full_key = result_cache.key(content_hash)
+    key = full_key if with_heatmaps else result_cache.key(content_hash, variant=mode)
+    computed: dict = {}
+
+    def compute() -> dict:
+        img = decode_image(content)
+        if near_duplicates is None:
+            return analyze_image(img, with_heatmaps)
+
+        image_phash = phash(img)
+        computed["phash"] = image_phash
+        for distance, match_key in near_duplicates.lookup(image_phash):
+            source_result, _ = result_cache.get(match_key)
+            if source_result is not None:
+                return reuse_near_duplicate(img, source_result, distance, with_heatmaps)
+            # результат уже витіснено (напр. до перезапуску) — хеш більше не потрібен
+            near_duplicates.remove([match_key])
+        return analyze_image(img, with_heatmaps)
+
+    # Повний результат містить і всі оцінки, тож годиться для mode="scores"
+    fallback_keys = [] if with_heatmaps else [full_key]
+    result, source = result_cache.get_or_compute(key, compute, fallback_keys=fallback_keys)
+
+    # В індекс потрапляють лише повноцінні аналізи (з heatmap), не похідні від інших
+    if (with_heatmaps and "phash" in computed and "near_duplicate" not in result
+            and "skipped_stages" not in result):
+        near_duplicates.add(computed["phash"], key)
+
+    if not with_heatmaps:
+        result = {k: v for k, v in result.items() if k != "heatmaps"}
+    return result, source
+
+
+def reuse_near_duplicate(img: Image.Image, source: dict, distance: int, with_heatmaps: bool) -> dict:
+    """
+    Візуально та сама картинка вже аналізувалась: з неї береться лише
+    глобальна оцінка AI-детектора. MVSS, EXIF і fusion рахуються для
+    поточного файлу — локальна вклейка не змінює pHash, але має
+    з'явитися в manipulation_score і heatmap.
+    """
+    ai_stage = "ai" if with_heatmaps else "ai_scores"
+    ai_heatmap = source.get("heatmaps", {}).get("ai") if with_heatmaps else None
+    result = analyze_image(img, with_heatmaps, known={ai_stage: (source["ai_score"], ai_heatmap)})
+    result["near_duplicate"] = {
+        "matched": True,
+        "distance": distance,
+        "radius": near_duplicates.radius,
+    }
+    return result
+
+
+def _stage_scores(group: str, value) -> dict:
+    """Оцінки fusion, які дає група етапів (див. early_exit.GROUP_SCORES)."""
+    if group == "ai":
+        return {"ai_score": value[0]}
+    if group == "mvss":
+        return {"manipulation_score": value["manipulation_score"], "patch_score": value["patch_score"]}
+    return {"metadata_score": float(value["metadata_score"])}
+
+
+def run_with_early_exit(img: Image.Image, targets: dict[str, str], known_stages: dict) -> tuple[dict, list[str]]:
+    """
+    Групи етапів (targets: група -> етап DAG) по черзі, від дешевшої до дорожчої.
+    Проміжні значення (піраміда, тензори) переходять у наступний запуск графа.
+    known_stages — уже відомі значення етапів (не перераховуються).
+    Вартість групи — сума часу всіх етапів, від яких вона залежить (зокрема
+    спільних, як-от піраміда, навіть якщо їх уже порахувала попередня група),
+    тож порядок не залежить від того, яка група запустилася першою.
+    Повертає (значення етапів, пропущені групи).
+    """
+    values: dict = {"image": img, **known_stages}
+    timings: dict[str, float] = {}
+    known: dict = {}
+    order = early_exit.order()
+    for i, group in enumerate(order):
+        if targets[group] not in values:
+            values = analysis_graph.run(stage_pool, values, targets=[targets[group]], timings=timings)
+            stages = analysis_graph.closure([targets[group]])
+            # етапи з known_stages не вимірювались — неповну вартість не записуємо
+            if stages <= timings.keys():
+                early_exit.record_cost(group, sum(timings[name] for name in stages))
+        known.update(_stage_scores(group, values[targets[group]]))
+
+        if i + 1 < len(order) and early_exit.decided(known):
+            skipped = order[i + 1:]
+            early_exit.record_exit(group, skipped)
+            return values, skipped
+
+    early_exit.record_exit(order[-1], [])
+    return values, []
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value, 3)
+
+
+def analyze_image(img: Image.Image, with_heatmaps: bool = True, known: Optional[dict] = None) -> dict:
+    """known — уже відомі значення етапів DAG (напр. оцінка AI майже-дубліката)."""
+    known = known or {}
+    ai_stage, mvss_stage = ("ai", "mvss") if with_heatmaps else ("ai_scores", "mvss_scores")
+    if serving_config.MVSS_MODE != "resize":
+        mvss_stage = mvss_stage.replace("mvss", f"mvss_{serving_config.MVSS_MODE}", 1)
+
+    skipped: list[str] = []
+    if early_exit is None:
+        stages = analysis_graph.run(stage_pool, {"image": img, **known}, targets=[ai_stage, mvss_stage, "metadata"])
+    else:
+        stages, skipped = run_with_early_exit(
+            img, {"ai": ai_stage, "mvss": mvss_stage, "metadata": "metadata"}, known,
+        )
+
+    # 1. AI DETECTOR
+    p_ai, ai_heatmap = stages.get(ai_stage, (None, None))
+
+    # 2. MANIPULATION DETECTOR
+    mvss_results = stages.get(mvss_stage, {})
+
+    manip_score = mvss_results.get("manipulation_score")
+    patch_score = mvss_results.get("patch_score")
+
+    # 3. METADATA
+    meta = stages.get("metadata", {"metadata_score": None, "reason": ""})
+    metadata_score = None if meta["metadata_score"] is None else float(meta["metadata_score"])
+
+    # 4. FUSION
+    if skipped:
+        # пропущені детектори вже не можуть перевести оцінку через поріг —
+        # віддаємо нижню межу (пропущені оцінки = 0)
+        fusion_score, _ = fusion_bounds({
+            "ai_score": p_ai,
+            "manipulation_score": manip_score,
+            "patch_score": patch_score,
+            "metadata_score": metadata_score,
+        })
+    else:
+        fusion_score = fusion_predict(
+            ai_score=p_ai,
+            manipulation_score=manip_score,
+            patch_score=patch_score,
+            metadata_score=metadata_score,
+        )
+
+    # 5. Результат: оцінки + heatmap як numpy (формат відповіді — у render_response)
+    result = {
+        "ai_score": _round(p_ai),
+        "manipulation_score": _round(manip_score),
+        "patch_score": _round(patch_score),
+
+        "metadata_score": _round(metadata_score),
+        "metadata_reason": meta["reason"],
+        "metadata_software": meta.get("software", ""),
+
+        "fusion_score": round(fusion_score, 3),
+    }
+    if skipped:
+        result["skipped_stages"] = skipped
+    if "refine_crops" in mvss_results:
+        result["mvss_refine_crops"] = mvss_results["refine_crops"]
+    if with_heatmaps:
+        heatmaps = {}
+        if ai_heatmap is not None:
+            heatmaps["ai"] = np.asarray(normalize_map(ai_heatmap), dtype=np.float32)
+        if "manip_heatmap" in mvss_results:
+            heatmaps["manip"] = np.asarray(mvss_results["manip_heatmap"], dtype=np.float32)
+        result["heatmaps"] = heatmaps
+    return result
+
+
+def build_history_row(user_id: int, filename: Optional[str], mime_type: Optional[str], file_size: int,
+                      result: dict, response: dict) -> ImageHistory:
+    summary = (
+        f"AI={response['ai_score']}, "
+        f"manip={response['manipulation_score']}, "
+        f"patch={response['patch_score']}, "
+        f"meta={response['metadata_score']}, "
+        f"fusion={response['fusion_score']}"
+    )
+
+    # Heatmap — у стиснене сховище, у рядку лише ключ
+    heatmaps_key = None
+    if result.get("heatmaps"):
+        heatmaps_key = get_heatmap_store().put(result["heatmaps"])
+
+    return ImageHistory(
+        user_id=user_id,
+        created_at=datetime.now(timezone.utc),
+        filename=filename or "unnamed",
+        file_size_bytes=file_size,
+        mime_type=mime_type,
+        analysis_summary=summary,
+        analysis_raw=json.dumps(strip_heatmaps(response)),
+        heatmaps_key=heatmaps_key,
+        **{name: response.get(name) for name in SCORE_COLUMNS},
+    )
+
+
+def cache_header(result: dict, cache_source: str) -> str:
+    if cache_source != SOURCE_COMPUTED:
+        return "HIT"
+    return "NEAR" if "near_duplicate" in result else "MISS"
+
+
+# Поля відповіді для mode="scores"
+SCORE_FIELDS = ("ai_score", "manipulation_score", "patch_score", "metadata_score", "fusion_score")
+
+
+def render_json(result: dict, mode: str, heatmap_format: str, heatmap_size: Optional[int]) -> tuple[dict, str]:
+    if mode == "scores":
+        response = {k: result[k] for k in SCORE_FIELDS}
+        for field in ("near_duplicate", "mvss_refine_crops", "skipped_stages"):
+            if field in result:
+                response[field] = result[field]
+    else:
+        response = render_response(result, heatmap_format, heatmap_size)
+    return response, json.dumps(response)
+
+
+def analyze_item(content: ImageContent, filename: str, mime_type: Optional[str], user_id: Optional[int],
+                 mode: str, heatmap_format: str, heatmap_size: Optional[int]):
+    """
+    Один файл поза /analyze_full (пакет /analyze_batch або завдання черги /jobs):
+    аналіз, JSON відповіді та рядок історії (ще не доданий у сесію).
+    """
+    file_size, content_hash = content_digest(content)
+    result, source = analyze_content(content, content_hash, mode)
+    response, response_json = render_json(result, mode, heatmap_format, heatmap_size)
+    history_row = None
+    if user_id is not None:
+        history_row = build_history_row(user_id, filename, mime_type, file_size, result, response)
+    return cache_header(result, source), response_json, history_row
@@ -1,33 +1,31 @@
 # backend/api.py
 
-import io
+import asyncio
 import json
-from typing import Optional
+from typing import Literal, Optional
 
-import numpy as np
-import torch
-from PIL import Image
+import anyio
 from fastapi import Depends
 from fastapi import FastAPI
 from fastapi import File, UploadFile
+from fastapi import HTTPException, Query, Response, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
+from backend.analysis import analyze_content, analyze_item, build_history_row, cache_header, render_json
 from backend.src.auth.dependencies import get_current_user_optional
 from backend.src.db import get_db
-from backend.src.fusion.fusion import fusion_predict
-from backend.src.models.ai_detector import build_ai_vit, get_vit_cam_layer
-from backend.src.models.image_history import ImageHistory
-from backend.src.models.mvss_manip import predict_mvss, load_mvss_model
+from backend.src.models.image_history import SCORE_COLUMNS, ImageHistory
 from backend.src.models.user import User
 from backend.src.routers import admin_model_metrics
-from backend.src.routers import auth, history, admin_stats
-from backend.src.utils.gradcam import ViTGradCAM
-from backend.src.utils.helpers import to_tensor
-from backend.src.utils.metadata import analyze_metadata
-
-DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
-MODELS_DIR = "backend/models"
+from backend.src.routers import auth, history, admin_stats, admin_serving, jobs
+from backend.src.serving import config as serving_config
+from backend.src.serving.executor import InferenceExecutor, QueueFullError
+from backend.src.utils.batch_input import BatchInputError, expand_uploads
+from backend.src.utils.image_decode import ImageContent, ImageDecodeError, ImageTooLargeError, content_digest
+from backend.src.utils.stats_rollup import record_analysis
 
 app = FastAPI(title="Image Analysis API")
 
@@ -43,123 +41,222 @@ app.include_router(auth.router)
 app.include_router(history.router)
 app.include_router(admin_stats.router)
 app.include_router(admin_model_metrics.router)
+app.include_router(admin_serving.router)
+app.include_router(jobs.router)
+
+inference_executor = InferenceExecutor(
+    "inference",
+    workers=serving_config.INFERENCE_WORKERS,
+    queue_size=serving_config.INFERENCE_QUEUE_SIZE,
+)
 
-AI_POS_IDX = 0  # індекс класу "ai_generated"
+# Окремий виконавець для /analyze_batch: більше паралельних аналізів,
+# щоб мікробатчі ViT/MVSS заповнювалися зображеннями одного пакету
+batch_executor = InferenceExecutor(
+    "batch",
+    workers=serving_config.BATCH_WORKERS,
+    queue_size=serving_config.BATCH_QUEUE_SIZE,
+)
 
-from pathlib import Path
 
-BASE_DIR = Path(__file__).resolve().parent
-MVSS_MODEL_PATH = BASE_DIR / "thirdparty" / "mvss_net" / "ckpt" / "mvssnetplus_casia.pt"
-mvss_model = load_mvss_model(str(MVSS_MODEL_PATH))
+def read_image_with_size(upload: UploadFile) -> tuple[ImageContent, int, str]:
+    """
+    Повертає (файл, розмір, sha256 вмісту). Файл не читається в пам'ять:
+    UploadFile вже спулиться на диск, хеш рахується частинами.
+    """
+    size, content_hash = content_digest(upload.file)
+    return upload.file, size, content_hash
 
-ai_model = build_ai_vit(num_classes=2, pretrained=False, freeze_backbone=False).to(DEVICE)
-try:
-    ai_model.load_state_dict(torch.load(f"{MODELS_DIR}/ai_vit_b16.pt", map_location=DEVICE))
-except FileNotFoundError:
-    print(f"Warning: {MODELS_DIR}/ai_vit_b16.pt not found. AI model will use random weights.")
 
-ai_model.eval()
-ai_cam = ViTGradCAM(ai_model, get_vit_cam_layer(ai_model))
+def run_analysis(upload: UploadFile, mode: str = "full") -> tuple[dict, int, str]:
+    """
+    Мультимодальний аналіз одного файлу з урахуванням кешу.
+    Виконується у воркері inference_executor.
+    mode="scores" — лише оцінки, без Grad-CAM і heatmap.
+    Повертає (результат, розмір файлу, джерело результату).
+    """
+    content, file_size, content_hash = read_image_with_size(upload)
+    result, source = analyze_content(content, content_hash, mode)
+    return result, file_size, source
 
 
-def prob_pos(logits: torch.Tensor, pos_idx: int) -> float:
-    proba = torch.softmax(logits, dim=1)[0, pos_idx].item()
-    return float(proba)
+def save_history(db: Session, user: User, upload: UploadFile, file_size: int,
+                 result: dict, response: dict) -> None:
+    history_row = build_history_row(user.id, upload.filename, upload.content_type, file_size, result, response)
+    db.add(history_row)
+    # агрегати адмін-панелі — у тій самій транзакції
+    record_analysis(db, user.id, history_row.created_at, response)
+    db.commit()
 
 
-def read_image_with_size(upload: UploadFile) -> tuple[Image.Image, int]:
-    img_bytes = upload.file.read()
-    size = len(img_bytes)
-    img = Image.open(io.BytesIO(img_bytes)).convert("RGB")
-    return img, size
+def save_history_bulk(db: Session, rows: list[ImageHistory]) -> None:
+    """Кілька рядків історії (з /analyze_batch) однією транзакцією."""
+    db.add_all(rows)
+    for row in rows:
+        record_analysis(db, row.user_id, row.created_at, {name: getattr(row, name) for name in SCORE_COLUMNS})
+    db.commit()
 
 
-def normalize_map(m: np.ndarray) -> np.ndarray:
-    m = np.array(m)
-    min_v = float(m.min())
-    max_v = float(m.max())
-    denom = max_v - min_v
-    if denom < 1e-8:
-        return np.zeros_like(m, dtype=np.float32)
-    return (m - min_v) / (denom + 1e-8)
+def _overloaded() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Сервер аналізу перевантажений. Спробуйте пізніше.",
+        headers={"Retry-After": str(serving_config.INFERENCE_RETRY_AFTER_S)},
+    )
 
 
 @app.post("/analyze_full")
-def analyze_full(
+async def analyze_full(
         file: UploadFile = File(...),
+        mode: Literal["full", "scores"] = Query("full"),
+        heatmap_format: Literal["json", "png", "f16"] = Query("json"),
+        heatmap_size: Optional[int] = Query(None, ge=8, le=1024),
         db: Session = Depends(get_db),
         current_user: Optional[User] = Depends(get_current_user_optional),
 ):
     """
     Повний мультимодальний аналіз.
+    Моделі працюють у inference_executor; при заповненій черзі — 503 з Retry-After.
+
+    heatmap_format: json (списки float), png (uint8 PNG у base64) або
+    f16 (float16 у base64). Для png/f16 карти передаються один раз у
+    "heatmaps", а поля *_heatmap містять посилання {"ref": назва}.
+    heatmap_size: максимальна сторона карт (area-даунсемплінг).
+    mode=scores: лише скалярні оцінки — без Grad-CAM backward і heatmap.
     """
-    img, file_size = read_image_with_size(file)
-
-    # 1. AI DETECTOR
-    x_ai = to_tensor(img, 224)
-    cam_ai, logits_ai = ai_cam(x_ai)
-    p_ai = prob_pos(logits_ai, AI_POS_IDX)
-    ai_heatmap = cam_ai[0, 0].detach().cpu().numpy()
-    ai_norm = normalize_map(ai_heatmap)
-
-    # 2. MANIPULATION DETECTOR
-    mvss_results = predict_mvss(mvss_model, np.array(img))
-
-    manip_score = mvss_results["manipulation_score"]
-    manip_heatmap = mvss_results["manip_heatmap"]
-
-    patch_score = mvss_results["patch_score"]
-    patch_heatmap = mvss_results["patch_heatmap"]
-
-    # 3. METADATA
-    meta = analyze_metadata(img)
-    metadata_score = float(meta["metadata_score"])
-
-    # 4. FUSION
-    fusion_score = fusion_predict(
-        ai_score=p_ai,
-        manipulation_score=manip_score,
-        patch_score=patch_score,
-        metadata_score=metadata_score,
-    )
+    try:
+        result, file_size, cache_source = await inference_executor.run(run_analysis, file, mode)
+    except QueueFullError:
+        raise _overloaded()
+    except ImageTooLargeError as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    except ImageDecodeError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    response, response_json = await run_in_threadpool(render_json, result, mode, heatmap_format, heatmap_size)
 
-    # 5. Підготовка відповіді
-    response = {
-        "ai_score": round(p_ai, 3),
-        "ai_heatmap": ai_norm.tolist(),
+    # 6. Збереження історії
+    if current_user is not None:
+        await run_in_threadpool(save_history, db, current_user, file, file_size, result, response)
 
-        "manipulation_score": round(manip_score, 3),
-        "manip_heatmap": manip_heatmap if isinstance(manip_heatmap, list) else manip_heatmap.tolist(),
-        "patch_score": round(patch_score, 3),
-        "patch_heatmap": patch_heatmap if isinstance(patch_heatmap, list) else patch_heatmap.tolist(),
+    return Response(
+        content=response_json,
+        media_type="application/json",
+        headers={"X-Cache": cache_header(result, cache_source)},
+    )
 
-        "metadata_score": round(metadata_score, 3),
-        "metadata_reason": meta["reason"],
-        "metadata_software": meta.get("software", ""),
 
-        "fusion_score": round(fusion_score, 3),
-        "fusion_heatmap": patch_heatmap if isinstance(patch_heatmap, list) else patch_heatmap.tolist(),
-    }
+# Пауза перед повторною спробою, коли черга batch_executor зайнята іншими пакетами
+BATCH_RETRY_S = 0.05
 
-    # 6. Збереження історії
-    if current_user is not None:
-        summary = (
-            f"AI={response['ai_score']}, "
-            f"manip={response['manipulation_score']}, "
-            f"patch={response['patch_score']}, "
-            f"meta={response['metadata_score']}, "
-            f"fusion={response['fusion_score']}"
-        )
 
-        history_row = ImageHistory(
-            user_id=current_user.id,
-            filename=file.filename or "unnamed",
-            file_size_bytes=file_size,
-            mime_type=file.content_type,
-            analysis_summary=summary,
-            analysis_raw=json.dumps(response),
+@app.post("/analyze_batch")
+async def analyze_batch(
+        files: list[UploadFile] = File(...),
+        mode: Literal["full", "scores"] = Query("full"),
+        heatmap_format: Literal["json", "png", "f16"] = Query("json"),
+        heatmap_size: Optional[int] = Query(None, ge=8, le=1024),
+        db: Session = Depends(get_db),
+        current_user: Optional[User] = Depends(get_current_user_optional),
+):
+    """
+    Пакетний аналіз: кілька файлів та/або ZIP-архіви в одному запиті.
+
+    Відповідь — NDJSON, по рядку на зображення в порядку завершення:
+    {"index", "filename", "cache", "result"} або {"index", "filename", "error"};
+    {"history_error"}, якщо пачку історії не вдалося записати;
+    останній рядок — {"done": true, "total", "failed"}.
+    Параметри mode / heatmap_format / heatmap_size — як у /analyze_full.
+    Історія для авторизованих користувачів пишеться пачками.
+    """
+    try:
+        items = await run_in_threadpool(
+            expand_uploads,
+            [(f.filename, f.content_type, f.file) for f in files],
+            serving_config.BATCH_MAX_FILES,
+            serving_config.BATCH_MAX_TOTAL_MB * 1024 * 1024,
+            serving_config.UPLOAD_SPOOL_MB * 1024 * 1024,
         )
-        db.add(history_row)
-        db.commit()
-
-    return response
+    except BatchInputError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    user_id = current_user.id if current_user is not None else None
+    window = max(1, serving_config.BATCH_WORKERS)
+    pending: dict = {}
+    next_index = 0
+
+    def fill_window() -> None:
+        """Тримає в роботі до window зображень цього пакету."""
+        nonlocal next_index
+        while next_index < len(items) and len(pending) < window:
+            filename, mime_type, content = items[next_index]
+            fut = batch_executor.submit(
+                analyze_item, content, filename, mime_type, user_id, mode, heatmap_format, heatmap_size,
+            )
+            pending[asyncio.wrap_future(fut)] = next_index
+            next_index += 1
+
+    # Перше вікно — до початку відповіді, щоб при перевантаженні повернути 503
+    try:
+        fill_window()
+    except QueueFullError:
+        for fut in pending:
+            fut.cancel()
+        raise _overloaded()
+
+    def flush_history(rows: list[ImageHistory]) -> Optional[str]:
+        """Записує рядки історії; при помилці БД — відкат і текст помилки."""
+        try:
+            save_history_bulk(db, rows)
+        except Exception as e:
+            db.rollback()
+            print(f"Warning: batch history write failed ({e}).")
+            return f"Не вдалося зберегти історію ({len(rows)} зображень): {e}"
+        return None
+
+    async def stream():
+        history: list[ImageHistory] = []
+        failed = 0
+        try:
+            while pending or next_index < len(items):
+                try:
+                    fill_window()
+                except QueueFullError:
+                    if not pending:
+                        await asyncio.sleep(BATCH_RETRY_S)
+                        continue
+
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for fut in done:
+                    index = pending.pop(fut)
+                    head = {"index": index, "filename": items[index][0]}
+                    try:
+                        cache, response_json, history_row = fut.result()
+                    except Exception as e:
+                        failed += 1
+                        yield json.dumps({**head, "error": f"Не вдалося проаналізувати файл: {e}"}) + "\n"
+                        continue
+
+                    head["cache"] = cache
+                    # до yield: якщо клієнт відключиться на ньому, рядок усе одно збережеться
+                    if history_row is not None:
+                        history.append(history_row)
+                    yield json.dumps(head)[:-1] + ', "result": ' + response_json + "}\n"
+
+                if len(history) >= serving_config.BATCH_HISTORY_FLUSH or (history and not pending):
+                    rows, history = history, []
+                    error = await run_in_threadpool(flush_history, rows)
+                    if error is not None:
+                        yield json.dumps({"history_error": error}) + "\n"
+
+            yield json.dumps({"done": True, "total": len(items), "failed": failed}) + "\n"
+        finally:
+            # клієнт відключився — не рахуємо решту пакету
+            for fut in pending:
+                fut.cancel()
+            # але історію вже відданих результатів зберігаємо; відміна запиту тут не діє
+            if history:
+                with anyio.CancelScope(shield=True):
+                    await run_in_threadpool(flush_history, history)
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
@@ -0,0 +1,143 @@
+# backend/job_worker.py
+#
+# Воркер черги завдань аналізу (таблиця analysis_jobs, див. /jobs).
+#   python -m backend.job_worker [--threads N] [--once]
+# Процесів можна запускати скільки завгодно, зокрема на інших вузлах:
+# узгоджуються вони лише через БД (оренда + SKIP LOCKED).
+
+import argparse
+import os
+import socket
+import threading
+import traceback
+
+from backend import analysis
+from backend.src import db as db_module
+from backend.src.serving import config as serving_config
+from backend.src.serving.job_queue import claim_job, complete_job, fail_job, heartbeat, reap_expired
+from backend.src.utils.image_decode import ImageDecodeError, ImageTooLargeError
+from backend.src.utils.upload_store import get_upload_store
+
+# Помилки самого файлу: повтор дасть той самий результат — завдання одразу failed.
+# FileNotFoundError — файл завдання зник зі сховища (напр. завдання старе за міграцію).
+NON_RETRYABLE_ERRORS = (ImageTooLargeError, ImageDecodeError, FileNotFoundError)
+
+
+class JobWorker:
+    def __init__(self, threads: int, lease_s: float, poll_s: float, backoff_s: float):
+        self.threads = max(1, threads)
+        self.lease_s = lease_s
+        self.poll_s = poll_s
+        self.backoff_s = backoff_s
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+
+        self._active: dict[str, str] = {}  # id завдання -> id потоку-воркера
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def process(self, session, job, worker_id: str) -> str:
+        try:
+            if job.payload_key is None:
+                raise FileNotFoundError("у завдання немає файлу")
+            with get_upload_store().open(job.payload_key) as payload:
+                cache, response_json, history_row = analysis.analyze_item(
+                    payload, job.filename, job.mime_type, job.user_id,
+                    job.mode, job.heatmap_format, job.heatmap_size,
+                )
+        except NON_RETRYABLE_ERRORS as e:
+            return fail_job(session, job, worker_id, f"{type(e).__name__}: {e}", self.backoff_s, retryable=False)
+        except Exception as e:
+            traceback.print_exc()
+            return fail_job(session, job, worker_id, f"{type(e).__name__}: {e}", self.backoff_s)
+
+        if complete_job(session, job, worker_id, cache, response_json, history_row):
+            return "done"
+        return "lost"
+
+    def run_once(self, worker_id: str) -> bool:
+        """Обробляє одне завдання. False — черга порожня."""
+        session = db_module.SessionLocal()
+        try:
+            job = claim_job(session, worker_id, self.lease_s)
+            if job is None:
+                return False
+            with self._lock:
+                self._active[job.id] = worker_id
+            try:
+                outcome = self.process(session, job, worker_id)
+            finally:
+                with self._lock:
+                    self._active.pop(job.id, None)
+            print(f"[{worker_id}] {job.id}: {outcome}")
+            return True
+        finally:
+            session.close()
+
+    def _loop(self, idx: int) -> None:
+        worker_id = f"{self.name}:{idx}"
+        while not self._stop.is_set():
+            try:
+                if not self.run_once(worker_id):
+                    self._stop.wait(self.poll_s)
+            except Exception:
+                traceback.print_exc()
+                self._stop.wait(self.poll_s)
+
+    def _heartbeat_loop(self) -> None:
+        while not self._stop.wait(self.lease_s / 3):
+            session = db_module.SessionLocal()
+            try:
+                with self._lock:
+                    active = list(self._active.items())
+                for job_id, worker_id in active:
+                    heartbeat(session, job_id, worker_id, self.lease_s)
+                reap_expired(session)
+            except Exception:
+                traceback.print_exc()
+            finally:
+                session.close()
+
+    def serve_forever(self) -> None:
+        threads = [
+            threading.Thread(target=self._loop, args=(i,), name=f"job-worker-{i}", daemon=True)
+            for i in range(self.threads)
+        ]
+        threads.append(threading.Thread(target=self._heartbeat_loop, name="job-heartbeat", daemon=True))
+        for t in threads:
+            t.start()
+        print(f"Воркер {self.name}: {self.threads} потоків, оренда {self.lease_s} с")
+        try:
+            while not self._stop.wait(1.0):
+                pass
+        except KeyboardInterrupt:
+            self._stop.set()
+
+    def drain(self) -> int:
+        """Обробляє чергу до спорожніння (в одному потоці) і повертає кількість завдань."""
+        session = db_module.SessionLocal()
+        try:
+            reap_expired(session)
+        finally:
+            session.close()
+        count = 0
+        while self.run_once(f"{self.name}:0"):
+            count += 1
+        return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Воркер черги завдань аналізу")
+    parser.add_argument("--threads", type=int, default=serving_config.JOB_WORKER_THREADS)
+    parser.add_argument("--once", action="store_true", help="обробити наявні завдання і завершитися")
+    args = parser.parse_args()
+
+    worker = JobWorker(
+        threads=args.threads,
+        lease_s=serving_config.JOB_LEASE_S,
+        poll_s=serving_config.JOB_POLL_INTERVAL_S,
+        backoff_s=serving_config.JOB_RETRY_BACKOFF_S,
+    )
+    if args.once:
+        print("Оброблено завдань:", worker.drain())
+    else:
+        worker.serve_forever()
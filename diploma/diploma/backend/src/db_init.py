@@ -1,6 +1,6 @@
 # backend/src/db_init.py
 from backend.src.db import Base, engine
-from backend.src.models import user, image_history  # noqa: F401
+from backend.src.models import user, image_history, stats_rollup, analysis_job  # noqa: F401
 from sqlalchemy import inspect
 
 if __name__ == "__main__":
@@ -0,0 +1,168 @@
+# backend/src/db_migrate.py
+#
+# Доводить схему існуючої БД до моделей (нові таблиці/колонки/індекси)
+# і переносить дані, що змінили місце зберігання.
+#   python -m backend.src.db_migrate
+
+import io
+import json
+
+from sqlalchemy import inspect, text
+
+from backend.src.db import Base, SessionLocal, engine
+from backend.src.models import user, image_history, stats_rollup, analysis_job  # noqa: F401
+from backend.src.models.image_history import SCORE_COLUMNS, ImageHistory
+from backend.src.models.stats_rollup import StatsDaily
+from backend.src.utils.heatmap_codec import extract_heatmaps, strip_heatmaps
+from backend.src.utils.heatmap_store import get_heatmap_store
+from backend.src.utils.stats_rollup import rebuild_rollups
+from backend.src.utils.upload_store import get_upload_store
+
+
+def add_missing_columns() -> list[str]:
+    """ALTER TABLE ... ADD COLUMN для колонок, яких ще немає в БД."""
+    insp = inspect(engine)
+    added = []
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not insp.has_table(table.name):
+                continue
+            existing = {c["name"] for c in insp.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                col_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}'))
+                added.append(f"{table.name}.{column.name}")
+
+            existing_indexes = {ix["name"] for ix in insp.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing_indexes:
+                    index.create(bind=conn)
+                    added.append(f"index {index.name}")
+    return added
+
+
+def move_heatmaps_to_store(batch_size: int = 200) -> int:
+    """Виносить heatmap зі старих analysis_raw у HeatmapStore."""
+    store = get_heatmap_store()
+    moved = 0
+    db = SessionLocal()
+    try:
+        last_id = 0
+        while True:
+            rows = (
+                db.query(ImageHistory)
+                .filter(ImageHistory.id > last_id, ImageHistory.heatmaps_key.is_(None))
+                .order_by(ImageHistory.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not rows:
+                break
+
+            for row in rows:
+                last_id = row.id
+                try:
+                    data = json.loads(row.analysis_raw) if row.analysis_raw else {}
+                    heatmaps = extract_heatmaps(data)
+                except Exception as e:
+                    print(f"Запис {row.id}: не вдалося розібрати analysis_raw ({e}), пропускаємо.")
+                    continue
+                if not heatmaps:
+                    continue
+
+                row.heatmaps_key = store.put(heatmaps)
+                row.analysis_raw = json.dumps(strip_heatmaps(data))
+                moved += 1
+            db.commit()
+    finally:
+        db.close()
+    return moved
+
+
+def move_job_payloads_to_store(batch_size: int = 50) -> int:
+    """
+    Виносить файли завдань черги зі старої колонки analysis_jobs.payload
+    в UploadStore. У моделі цієї колонки вже немає — лише сирий SQL.
+    """
+    columns = {c["name"] for c in inspect(engine).get_columns("analysis_jobs")}
+    if "payload" not in columns:
+        return 0
+
+    store = get_upload_store()
+    moved = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(
+                text("SELECT id, payload FROM analysis_jobs WHERE payload IS NOT NULL LIMIT :n"),
+                {"n": batch_size},
+            ).all()
+            if not rows:
+                break
+            for job_id, payload in rows:
+                key, _ = store.put(io.BytesIO(payload), len(payload))
+                conn.execute(
+                    text("UPDATE analysis_jobs SET payload_key = :key, payload = NULL WHERE id = :id"),
+                    {"key": key, "id": job_id},
+                )
+                moved += 1
+    return moved
+
+
+def backfill_score_columns(batch_size: int = 500) -> int:
+    """Заповнює колонки оцінок зі старих analysis_raw."""
+    filled = 0
+    db = SessionLocal()
+    try:
+        last_id = 0
+        while True:
+            rows = (
+                db.query(ImageHistory)
+                .filter(
+                    ImageHistory.id > last_id,
+                    ImageHistory.fusion_score.is_(None),
+                    ImageHistory.analysis_raw.isnot(None),
+                )
+                .order_by(ImageHistory.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not rows:
+                break
+
+            for row in rows:
+                last_id = row.id
+                try:
+                    data = json.loads(row.analysis_raw)
+                except Exception:
+                    continue
+                for name in SCORE_COLUMNS:
+                    value = data.get(name)
+                    if value is not None:
+                        setattr(row, name, float(value))
+                filled += 1
+            db.commit()
+    finally:
+        db.close()
+    return filled
+
+
+def init_rollups() -> dict | None:
+    """Первинне заповнення агрегатів, якщо таблиця stats_daily ще порожня."""
+    db = SessionLocal()
+    try:
+        if db.query(StatsDaily.day).first() is not None:
+            return None
+        return rebuild_rollups(db)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    Base.metadata.create_all(bind=engine)
+    print("Додано:", add_missing_columns() or "нічого")
+    print("Перенесено heatmap у сховище:", move_heatmaps_to_store())
+    print("Перенесено файли завдань у сховище:", move_job_payloads_to_store())
+    print("Заповнено колонки оцінок:", backfill_score_columns())
+    print("Агрегати статистики:", init_rollups() or "вже заповнені")
@@ -0,0 +1,59 @@
+# backend/src/models/analysis_job.py
+
+from datetime import datetime, timezone
+
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Float, Index
+from sqlalchemy.orm import deferred
+
+from backend.src.db import Base
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+
+class AnalysisJob(Base):
+    """Завдання асинхронного аналізу (черга в БД, обробляється воркерами)."""
+    __tablename__ = "analysis_jobs"
+
+    id = Column(String(32), primary_key=True)
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=True, index=True)
+
+    status = Column(String(16), nullable=False, default=JOB_QUEUED)
+
+    # Параметри аналізу — як у /analyze_full
+    mode = Column(String(16), nullable=False, default="full")
+    heatmap_format = Column(String(8), nullable=False, default="json")
+    heatmap_size = Column(Integer, nullable=True)
+
+    filename = Column(String(255), nullable=False)
+    mime_type = Column(String(100), nullable=True)
+    file_size_bytes = Column(Integer, nullable=True)
+    # Ключ файлу в UploadStore (JOB_UPLOAD_DIR); файл видаляється після завершення завдання
+    payload_key = Column(String(32), nullable=True)
+
+    # Оренда: воркер володіє завданням до lease_expires_at (продовжує heartbeat-ом)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    lease_owner = Column(String(128), nullable=True)
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)
+    # Не брати в роботу раніше (відкладений повтор після помилки)
+    available_at = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
+
+    # Таймінги
+    created_at = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    queue_ms = Column(Float, nullable=True)
+    run_ms = Column(Float, nullable=True)
+
+    cache = Column(String(8), nullable=True)
+    result_json = deferred(Column(Text, nullable=True))
+    error = Column(Text, nullable=True)
+    history_id = Column(Integer, ForeignKey("image_history.id", ondelete="SET NULL"), nullable=True)
+
+    __table_args__ = (
+        Index("ix_analysis_jobs_claim", "status", "available_at"),
+    )
@@ -0,0 +1,189 @@
+# backend/src/models/face_suppression.py
+#
+# Маска придушення облич для детектора маніпуляцій: області облич
+# (ретуш, згладжування шкіри) дають хибні спрацювання MVSSNet.
+# Детектор завантажується один раз на потік, шукає обличчя на зменшеному
+# сірому каналі, а знайдені рамки кешуються за хешем зображення.
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Tuple
+
+import cv2
+import numpy as np
+
+from backend.src.serving import config as serving_config
+from backend.src.serving.metrics import register_metrics
+
+Box = Tuple[int, int, int, int]  # x, y, w, h
+
+# Якість / вартість детекції: сторона сірого каналу для пошуку та крок масштабу.
+# accurate — як раніше (повні 512, scaleFactor 1.1).
+FACE_DETECT_PROFILES: Dict[str, Dict[str, Any]] = {
+    "fast": {"detect_size": 256, "scale_factor": 1.2},
+    "balanced": {"detect_size": 320, "scale_factor": 1.1},
+    "accurate": {"detect_size": None, "scale_factor": 1.1},
+}
+
+# Поля навколо обличчя, частка від розміру рамки
+PAD_X = 0.1
+PAD_Y = 0.2
+MIN_FACE_SIZE = 30  # у пікселях повного розміру
+
+
+class FaceDetector:
+    """Інтерфейс детектора облич: рамки (x, y, w, h) у координатах переданого сірого каналу."""
+
+    def detect(self, gray: np.ndarray, min_size: int) -> List[Box]:
+        raise NotImplementedError
+
+
+class HaarFaceDetector(FaceDetector):
+    """Каскад Хаара з OpenCV. CascadeClassifier не потокобезпечний — свій екземпляр на потік."""
+
+    def __init__(self, cascade_path: str | None = None, scale_factor: float = 1.1, min_neighbors: int = 5):
+        self.cascade_path = cascade_path or cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self._local = threading.local()
+
+    def _cascade(self):
+        cascade = getattr(self._local, "cascade", None)
+        if cascade is None:
+            cascade = cv2.CascadeClassifier(self.cascade_path)
+            self._local.cascade = cascade
+        return cascade
+
+    def detect(self, gray: np.ndarray, min_size: int) -> List[Box]:
+        cascade = self._cascade()
+        if cascade.empty():
+            return []
+        faces = cascade.detectMultiScale(
+            gray,
+            scaleFactor=self.scale_factor,
+            minNeighbors=self.min_neighbors,
+            minSize=(min_size, min_size),
+        )
+        return [tuple(int(v) for v in face) for face in faces]
+
+
+# Реєстр детекторів: назва -> фабрика(профіль якості)
+_DETECTORS: Dict[str, Callable[[Dict[str, Any]], FaceDetector]] = {
+    "haar": lambda profile: HaarFaceDetector(scale_factor=profile["scale_factor"]),
+}
+
+
+def register_face_detector(name: str, factory: Callable[[Dict[str, Any]], FaceDetector]) -> None:
+    _DETECTORS[name] = factory
+
+
+class FaceSuppressionEngine:
+    def __init__(self, detector: FaceDetector, detect_size: int | None, cache_size: int):
+        self.detector = detector
+        self.detect_size = detect_size
+        self.cache_size = max(0, cache_size)
+        self._cache: "OrderedDict[bytes, List[Box]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._errors = 0
+        self._detect_ms_total = 0.0
+
+    def _detect(self, gray: np.ndarray) -> List[Box]:
+        h, w = gray.shape[:2]
+        scale = 1.0
+        if self.detect_size and max(h, w) > self.detect_size:
+            scale = self.detect_size / max(h, w)
+            gray = cv2.resize(gray, (max(1, round(w * scale)), max(1, round(h * scale))),
+                              interpolation=cv2.INTER_AREA)
+
+        min_size = max(1, round(MIN_FACE_SIZE * scale))
+        boxes = self.detector.detect(gray, min_size)
+        if scale == 1.0:
+            return boxes
+        return [(round(x / scale), round(y / scale), round(bw / scale), round(bh / scale)) for x, y, bw, bh in boxes]
+
+    def boxes(self, gray: np.ndarray) -> List[Box]:
+        # кешуються рамки, а не самі маски (512x512 float32 — 1 МБ кожна)
+        h = hashlib.blake2b(np.ascontiguousarray(gray).data, digest_size=16)
+        h.update(str(gray.shape).encode("ascii"))
+        key = h.digest()
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self._hits += 1
+                return cached
+
+        started = time.perf_counter()
+        boxes = self._detect(gray)
+        with self._lock:
+            self._misses += 1
+            self._detect_ms_total += (time.perf_counter() - started) * 1000.0
+            if self.cache_size:
+                self._cache[key] = boxes
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return boxes
+
+    def mask(self, image_rgb: np.ndarray, gray: np.ndarray | None = None) -> np.ndarray:
+        """float32-маска HxW: 0 — область обличчя (з полями), 1 — решта."""
+        h, w = image_rgb.shape[:2]
+        suppression_mask = np.ones((h, w), dtype=np.float32)
+        try:
+            if gray is None:
+                gray = cv2.cvtColor(image_rgb, cv2.COLOR_RGB2GRAY)
+            boxes = self.boxes(gray)
+        except Exception as e:
+            with self._lock:
+                self._errors += 1
+            print(f"Warning: Face detection failed ({e}), skipping suppression.")
+            return suppression_mask
+
+        for (x, y, bw, bh) in boxes:
+            pad_w = int(PAD_X * bw)
+            pad_h = int(PAD_Y * bh)
+            x1 = max(0, x - pad_w)
+            y1 = max(0, y - pad_h)
+            x2 = min(w, x + bw + pad_w)
+            y2 = min(h, y + bh + pad_h)
+            suppression_mask[y1:y2, x1:x2] = 0.0
+        return suppression_mask
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "detector": type(self.detector).__name__,
+                "detect_size": self.detect_size,
+                "cache_entries": len(self._cache),
+                "hits": self._hits,
+                "misses": self._misses,
+                "errors": self._errors,
+                "avg_detect_ms": (self._detect_ms_total / self._misses) if self._misses else None,
+            }
+
+
+def face_detect_settings() -> Dict[str, Any]:
+    """Детектор і фактичний профіль якості (невідомий FACE_DETECT_QUALITY -> balanced)."""
+    quality = serving_config.FACE_DETECT_QUALITY
+    if quality not in FACE_DETECT_PROFILES:
+        quality = "balanced"
+    return {"detector": serving_config.FACE_DETECTOR, "quality": quality, **FACE_DETECT_PROFILES[quality]}
+
+
+@lru_cache(maxsize=1)
+def get_face_engine() -> FaceSuppressionEngine:
+    profile = FACE_DETECT_PROFILES[face_detect_settings()["quality"]]
+    factory = _DETECTORS.get(serving_config.FACE_DETECTOR)
+    if factory is None:
+        raise ValueError(f"Невідомий детектор облич: {serving_config.FACE_DETECTOR}")
+    engine = FaceSuppressionEngine(
+        factory(profile),
+        detect_size=profile["detect_size"],
+        cache_size=serving_config.FACE_MASK_CACHE_SIZE,
+    )
+    register_metrics("face_suppression", engine.stats)
+    return engine
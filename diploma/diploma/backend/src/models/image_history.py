@@ -2,7 +2,7 @@
 
 from datetime import datetime, timezone
 
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, Float
 from sqlalchemy.orm import relationship
 
 from backend.src.db import Base
@@ -13,12 +13,13 @@ class ImageHistory(Base):
 
     id = Column(Integer, primary_key=True, index=True)
 
-    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
 
     created_at = Column(
         DateTime(timezone=True),
         default=lambda: datetime.now(timezone.utc),
         nullable=False,
+        index=True,
     )
 
     filename = Column(String(255), nullable=False)
@@ -28,4 +29,17 @@ class ImageHistory(Base):
     analysis_summary = Column(String(500), nullable=True)
     analysis_raw = Column(Text, nullable=True)
 
+    # Ключ heatmap у HeatmapStore (самі карти в БД не зберігаються)
+    heatmaps_key = Column(String(64), nullable=True)
+
+    # Оцінки окремими колонками — для агрегацій на боці SQL
+    ai_score = Column(Float, nullable=True, index=True)
+    manipulation_score = Column(Float, nullable=True, index=True)
+    patch_score = Column(Float, nullable=True, index=True)
+    metadata_score = Column(Float, nullable=True, index=True)
+    fusion_score = Column(Float, nullable=True, index=True)
+
     user = relationship("User", back_populates="images")
+
+
+SCORE_COLUMNS = ("ai_score", "manipulation_score", "patch_score", "metadata_score", "fusion_score")
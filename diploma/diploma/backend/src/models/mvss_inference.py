@@ -0,0 +1,109 @@
+# backend/src/models/mvss_inference.py
+#
+# Інференс-версія MVSSNet для сервісу. MVSSNet.forward завжди рахує гілку
+# edge-supervision (4 x run_sobel + 7 ERB -> res1), але predict_mvss
+# використовує лише маску DA-head (x0). Тут:
+#   * гілка Sobel/ERB не обчислюється взагалі;
+#   * ядро BayarConv2d нормалізується один раз (а не на кожному forward);
+#   * BatchNorm згорнуто в попередні згортки (backbone, noise extractor, DA-head).
+# Еквівалентність з оригінальним forward: backend/tests/test_mvss_inference.py
+
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from torch.nn.utils.fusion import fuse_conv_bn_eval
+
+from backend.thirdparty.mvss_net.models.mvssnet import rgb2gray
+
+
+def _fold(owner: nn.Module, conv_name: str, bn_name: str) -> None:
+    conv, bn = getattr(owner, conv_name), getattr(owner, bn_name)
+    if isinstance(conv, nn.Conv2d) and isinstance(bn, nn.BatchNorm2d):
+        setattr(owner, conv_name, fuse_conv_bn_eval(conv, bn))
+        setattr(owner, bn_name, nn.Identity())
+
+
+def _fold_sequential(seq: nn.Sequential) -> None:
+    """Conv2d, за яким іде BatchNorm2d, у межах одного nn.Sequential."""
+    for i in range(len(seq) - 1):
+        if isinstance(seq[i], nn.Conv2d) and isinstance(seq[i + 1], nn.BatchNorm2d):
+            seq[i] = fuse_conv_bn_eval(seq[i], seq[i + 1])
+            seq[i + 1] = nn.Identity()
+
+
+def _fold_bottleneck(block: nn.Module) -> None:
+    _fold(block, "conv1", "bn1")
+    _fold(block, "conv2", "bn2")
+    _fold(block, "conv3", "bn3")
+    if block.downsample is not None:
+        _fold_sequential(block.downsample)
+
+
+def _fold_resnet(resnet: nn.Module) -> None:
+    _fold(resnet, "conv1", "bn1")
+    for layer in (resnet.layer1, resnet.layer2, resnet.layer3, resnet.layer4):
+        for block in layer:
+            _fold_bottleneck(block)
+
+
+def _resnet_features(resnet: nn.Module, x: torch.Tensor) -> torch.Tensor:
+    """Як ResNet50.base_forward, але повертає лише останню карту ознак (c4)."""
+    x = resnet.relu(resnet.bn1(resnet.conv1(x)))
+    x = resnet.maxpool(x)
+    x = resnet.layer1(x)
+    x = resnet.layer2(x)
+    x = resnet.layer3(x)
+    return resnet.layer4(x)
+
+
+class MVSSNetInference(nn.Module):
+    """
+    Обгортка над навченою MVSSNet (у режимі eval), що повертає лише
+    маску x0 [B, nclass, H, W] (логіти). Модулі беруться з переданої
+    моделі без копіювання — BN у них згортається на місці, тому після
+    обгортання вихідну модель не слід використовувати окремо.
+    """
+
+    def __init__(self, model: nn.Module):
+        super().__init__()
+        model.eval()
+        self.backbone = model.model
+        self.head = model.head
+        self.constrain = model.constrain
+
+        if self.constrain:
+            self.noise_extractor = model.noise_extractor.model
+            bayar = model.constrain_conv
+            with torch.no_grad():
+                weight = bayar.bayarConstraint().detach().clone()
+            self.register_buffer("bayar_weight", weight)
+            self.bayar_stride = bayar.stride
+            self.bayar_padding = bayar.padding
+
+        with torch.no_grad():
+            _fold_resnet(self.backbone)
+            if self.constrain:
+                _fold_resnet(self.noise_extractor)
+            for seq in (self.head.conv_p1, self.head.conv_c1, self.head.conv_p2, self.head.conv_c2):
+                _fold_sequential(seq)
+        self.eval()
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        size = x.shape[2:]
+        c4 = _resnet_features(self.backbone, x)
+
+        if self.constrain:
+            noise = F.conv2d(rgb2gray(x), self.bayar_weight, stride=self.bayar_stride, padding=self.bayar_padding)
+            c4 = torch.cat([c4, _resnet_features(self.noise_extractor, noise)], dim=1)
+
+        out = self.head(c4)[0]
+        return F.interpolate(out, size, mode="bilinear", align_corners=True)
+
+
+def max_relative_error(reference: nn.Module, optimized: nn.Module, x: torch.Tensor) -> float:
+    """max |x0_ref - x0_opt| / max |x0_ref| на логітах маски."""
+    with torch.inference_mode():
+        expected = reference(x)[1]
+        actual = optimized(x)
+    return ((expected - actual).abs().max() / expected.abs().max().clamp(min=1e-6)).item()
+
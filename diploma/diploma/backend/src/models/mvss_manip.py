@@ -1,26 +1,32 @@
 # backend/src/models/mvss_manip.py
 
-import os
-
 import cv2
 import numpy as np
 import torch
-from torchvision import transforms
 
+from backend.src.models.face_suppression import get_face_engine
+from backend.src.models.mvss_inference import MVSSNetInference
+from backend.src.models.mvss_scoring import refined_score_np, score_mask_batch
+from backend.src.serving import config as serving_config
+from backend.src.serving.onnx_runtime import MVSS_ONNX_FILE, load_onnx_model
+from backend.src.utils.helpers import model_device
+from backend.src.utils.preprocess import ImagePyramid, resize_area
 from backend.thirdparty.mvss_net.models.mvssnet import get_mvss
 
 DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
 
-norm_mean = [0.485, 0.456, 0.406]
-norm_std = [0.229, 0.224, 0.225]
-
-transform_fn = transforms.Compose([
-    transforms.ToTensor(),
-    transforms.Normalize(norm_mean, norm_std)
-])
+MVSS_INPUT_SIZE = 512
 
+def load_mvss_model(model_path: str, optimized: bool | None = None, backend: str | None = None):
+    """
+    backend: torch | onnx (за замовчуванням INFERENCE_BACKEND). ONNX-модель —
+    експорт інференс-версії з того самого чекпойнта (backend/training/export_onnx.py).
+    """
+    if (backend or serving_config.INFERENCE_BACKEND) == "onnx":
+        onnx_model = load_onnx_model(MVSS_ONNX_FILE)
+        if onnx_model is not None:
+            return onnx_model
 
-def load_mvss_model(model_path: str):
     print(f"Loading MVSS model from: {model_path}")
     model = get_mvss(
         backbone='resnet50',
@@ -29,6 +35,7 @@ def load_mvss_model(model_path: str):
         sobel=True,
         constrain=True,
         n_input=3,
+        attention_block_size=serving_config.MVSS_ATTENTION_BLOCK_SIZE,
     )
     ckpt = torch.load(model_path, map_location=DEVICE)
 
@@ -40,42 +47,17 @@ def load_mvss_model(model_path: str):
         state = ckpt
 
     model.load_state_dict(state, strict=False)
-    model.to(DEVICE)
     model.eval()
+    if optimized is None:
+        optimized = bool(serving_config.MVSS_INFERENCE_OPTIMIZED)
+    if optimized:
+        model = MVSSNetInference(model)
+    model.to(DEVICE)
     return model
 
 
-def get_suppression_mask(image_rgb: np.ndarray) -> np.ndarray:
-    try:
-        gray = cv2.cvtColor(image_rgb, cv2.COLOR_RGB2GRAY)
-        cascade_path = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-
-        if not os.path.exists(cascade_path):
-            pass
-
-        face_cascade = cv2.CascadeClassifier(cascade_path)
-
-        if face_cascade.empty():
-            return np.ones((image_rgb.shape[0], image_rgb.shape[1]), dtype=np.float32)
-
-        faces = face_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(30, 30))
-        suppression_mask = np.ones_like(gray, dtype=np.float32)
-
-        for (x, y, w, h) in faces:
-            pad_w = int(0.1 * w)
-            pad_h = int(0.2 * h)
-
-            x1 = max(0, x - pad_w)
-            y1 = max(0, y - pad_h)
-            x2 = min(gray.shape[1], x + w + pad_w)
-            y2 = min(gray.shape[0], y + h + pad_h)
-
-            suppression_mask[y1:y2, x1:x2] = 0.0
-
-        return suppression_mask
-    except Exception as e:
-        print(f"Warning: Face detection failed ({e}), skipping suppression.")
-        return np.ones((image_rgb.shape[0], image_rgb.shape[1]), dtype=np.float32)
+def get_suppression_mask(image_rgb: np.ndarray, gray: np.ndarray | None = None) -> np.ndarray:
+    return get_face_engine().mask(image_rgb, gray)
 
 
 def calculate_refined_score(mask_tensor, suppression_mask=None) -> float:
@@ -91,46 +73,32 @@ def calculate_refined_score(mask_tensor, suppression_mask=None) -> float:
 
         mask_np = mask_np * suppression_mask
 
-    binary_threshold = 0.50
-    binary_mask = (mask_np > binary_threshold).astype(np.uint8)
-
-    kernel = np.ones((3, 3), np.uint8)
-    cleaned_mask = cv2.morphologyEx(binary_mask, cv2.MORPH_OPEN, kernel)
+    return refined_score_np(mask_np)
 
-    pixel_count = np.sum(cleaned_mask)
-    if pixel_count == 0:
-        return 0.0
 
-    total_pixels = mask_np.shape[0] * mask_np.shape[1]
-    area_ratio = pixel_count / total_pixels
+def resize_for_mvss(image_rgb: np.ndarray) -> np.ndarray:
+    return resize_area(image_rgb, MVSS_INPUT_SIZE)
 
-    if area_ratio > 0.25:
-        return 0.0
 
-    masked_prob = mask_np * cleaned_mask
-    base_confidence = np.sum(masked_prob) / pixel_count
+def predict_mvss_batch(model, images_rgb: list[np.ndarray | ImagePyramid],
+                       suppression_masks: list[np.ndarray | None] | None = None) -> list[dict]:
+    """
+    Один forward MVSSNet для N зображень. Модель має бути вже
+    переведена в eval() і на DEVICE (див. load_mvss_model).
+    Зображення — RGB-масиви або ImagePyramid (тоді тензор 512 і сірий
+    канал беруться з неї без повторного препроцесингу).
+    suppression_masks можна передати заздалегідь обчисленими
+    (для зображень 512x512), інакше вони рахуються тут.
+    """
+    if not images_rgb:
+        return []
+    if suppression_masks is None:
+        suppression_masks = [None] * len(images_rgb)
 
-    min_area_threshold = 0.001
+    pyramids = [img if isinstance(img, ImagePyramid) else ImagePyramid(img) for img in images_rgb]
+    device = model_device(model)
+    input_tensor = torch.cat([p.tensor(MVSS_INPUT_SIZE) for p in pyramids]).to(device)
 
-    if area_ratio >= min_area_threshold:
-        area_factor = 1.0
-    else:
-        area_factor = (area_ratio / min_area_threshold) ** 2
-
-    final_score = base_confidence * area_factor
-    return float(final_score)
-
-
-def predict_mvss(model, image_rgb: np.ndarray):
-    #  Resize 512x512
-    img_resized = cv2.resize(image_rgb, (512, 512), interpolation=cv2.INTER_AREA)
-    suppression_mask = get_suppression_mask(img_resized)
-    input_tensor = transform_fn(img_resized).unsqueeze(0)
-    if torch.cuda.is_available():
-        input_tensor = input_tensor.cuda()
-        model = model.cuda()
-
-    model.eval()
     with torch.no_grad():
         preds = model(input_tensor)
         if isinstance(preds, (list, tuple)):
@@ -138,25 +106,28 @@ def predict_mvss(model, image_rgb: np.ndarray):
         else:
             pred_mask = preds
 
-        prob_mask = torch.sigmoid(pred_mask).squeeze().cpu()
+        prob_masks = torch.sigmoid(pred_mask)  # [B, 1, H, W]
 
-    manipulation_score = calculate_refined_score(prob_mask, suppression_mask)
-    mask_np = prob_mask.numpy() if isinstance(prob_mask, torch.Tensor) else prob_mask
+    suppression_masks = [
+        mask if mask is not None
+        else get_suppression_mask(pyramid.level(MVSS_INPUT_SIZE), pyramid.gray(MVSS_INPUT_SIZE))
+        for pyramid, mask in zip(pyramids, suppression_masks)
+    ]
+    suppression = torch.from_numpy(np.stack(suppression_masks).astype(np.float32, copy=False))[:, None]
 
-    if suppression_mask is not None:
-        if suppression_mask.shape != mask_np.shape:
-            s_mask = cv2.resize(suppression_mask, (mask_np.shape[1], mask_np.shape[0]), interpolation=cv2.INTER_NEAREST)
-        else:
-            s_mask = suppression_mask
-        visual_heatmap = mask_np * s_mask
-    else:
-        visual_heatmap = mask_np
+    # Придушення облич і оцінки — для всього батчу (на GPU без проміжних копій на CPU)
+    manip_scores, patch_scores, heatmaps = score_mask_batch(prob_masks, suppression)
+
+    return [
+        {
+            "manipulation_score": manip_scores[i],
+            "manip_heatmap": heatmaps[i],
+            "patch_score": patch_scores[i],
+            "patch_heatmap": heatmaps[i],
+        }
+        for i in range(len(pyramids))
+    ]
 
-    patch_score = float(np.mean(visual_heatmap))
 
-    return {
-        "manipulation_score": manipulation_score,
-        "manip_heatmap": visual_heatmap,
-        "patch_score": patch_score,
-        "patch_heatmap": visual_heatmap
-    }
+def predict_mvss(model, image_rgb: np.ndarray):
+    return predict_mvss_batch(model, [image_rgb])[0]
@@ -0,0 +1,211 @@
+# backend/src/models/mvss_tiling.py
+#
+# Тайловий інференс MVSSNet на (обмеженій) повній роздільності.
+# Звичайний шлях стискає будь-яке зображення до 512x512: дрібні вклейки
+# у 4000-px фото усереднюються, пропорції спотворюються. Тут зображення
+# ріжеться на тайли 512 з перекриттям, тайли проходять через модель
+# батчами, а ймовірності зшиваються з віконною вагою в одну карту
+# розміру зображення. Пам'ять моделі обмежена батчем тайлів.
+#
+# Каскад (MVSSCascade): спершу звичайний глобальний прохід 512, а на
+# повній роздільності повторно проганяються лише тайли, де груба карта
+# перевищує поріг. Чисті зображення (більшість трафіку) коштують один прохід.
+
+import threading
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+import torch
+
+from backend.src.models.mvss_scoring import refined_score_np
+from backend.src.serving import config as serving_config
+from backend.src.serving.metrics import register_metrics
+from backend.src.utils.helpers import model_device
+from backend.src.utils.preprocess import normalize_to_tensor
+
+TILE_SIZE = 512
+# Довша сторона heatmap у відповіді; оцінки рахуються на повній зшитій карті
+HEATMAP_MAX_SIDE = 1024
+
+
+def cap_side(rgb: np.ndarray, max_side: Optional[int]) -> np.ndarray:
+    """Зменшення (INTER_AREA, зі збереженням пропорцій), якщо довша сторона > max_side."""
+    h, w = rgb.shape[:2]
+    if not max_side or max(h, w) <= max_side:
+        return rgb
+    scale = max_side / max(h, w)
+    return cv2.resize(rgb, (max(1, round(w * scale)), max(1, round(h * scale))), interpolation=cv2.INTER_AREA)
+
+
+def tile_origins(length: int, tile: int, stride: int) -> List[int]:
+    """Початки тайлів уздовж осі; останній тайл вирівняно по краю."""
+    if length <= tile:
+        return [0]
+    origins = list(range(0, length - tile, stride))
+    origins.append(length - tile)
+    return origins
+
+
+@lru_cache(maxsize=4)
+def tile_window(tile: int) -> np.ndarray:
+    """
+    2D-вікно Ганна без нульових країв: центр тайла важить більше,
+    ніж краї з обрізаним контекстом; на межах зображення, де тайл
+    один, ненульова вага дає просто його значення.
+    """
+    w1 = np.hanning(tile + 2)[1:-1].astype(np.float32)
+    return np.outer(w1, w1)
+
+
+def _working_image(image_rgb: np.ndarray, max_side: Optional[int]) -> np.ndarray:
+    rgb = cap_side(image_rgb, max_side)
+    h, w = rgb.shape[:2]
+    if min(h, w) < TILE_SIZE:
+        # Коротша сторона менша за тайл — збільшуємо до тайла (як і звичайний шлях)
+        scale = TILE_SIZE / min(h, w)
+        h, w = max(TILE_SIZE, round(h * scale)), max(TILE_SIZE, round(w * scale))
+        rgb = cv2.resize(rgb, (w, h), interpolation=cv2.INTER_LINEAR)
+    return rgb
+
+
+def _tile_grid(h: int, w: int, overlap: int) -> List[Tuple[int, int]]:
+    stride = max(1, TILE_SIZE - max(0, overlap))
+    return [(y, x) for y in tile_origins(h, TILE_SIZE, stride) for x in tile_origins(w, TILE_SIZE, stride)]
+
+
+def _run_tiles(model, rgb: np.ndarray, origins: List[Tuple[int, int]],
+               batch_size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Зважені суми ймовірностей і ваг тайлів (acc, weight) розміру зображення."""
+    h, w = rgb.shape[:2]
+    window = tile_window(TILE_SIZE)
+    acc = np.zeros((h, w), dtype=np.float32)
+    weight = np.zeros((h, w), dtype=np.float32)
+    device = model_device(model)
+    batch_size = max(1, batch_size)
+
+    for start in range(0, len(origins), batch_size):
+        chunk = origins[start:start + batch_size]
+        x = torch.cat([
+            normalize_to_tensor(np.ascontiguousarray(rgb[y:y + TILE_SIZE, x0:x0 + TILE_SIZE]))
+            for y, x0 in chunk
+        ]).to(device)
+        with torch.no_grad():
+            preds = model(x)
+            if isinstance(preds, (list, tuple)):
+                preds = preds[-1]
+            probs = torch.sigmoid(preds)[:, 0].float().cpu().numpy()
+
+        for (y, x0), prob in zip(chunk, probs):
+            acc[y:y + TILE_SIZE, x0:x0 + TILE_SIZE] += prob * window
+            weight[y:y + TILE_SIZE, x0:x0 + TILE_SIZE] += window
+    return acc, weight
+
+
+def _finish(prob_map: np.ndarray, suppression_mask: Optional[np.ndarray]) -> dict:
+    h, w = prob_map.shape
+    if suppression_mask is not None:
+        if suppression_mask.shape[:2] != (h, w):
+            suppression_mask = cv2.resize(suppression_mask, (w, h), interpolation=cv2.INTER_NEAREST)
+        prob_map *= suppression_mask
+
+    heatmap = cap_side(prob_map, HEATMAP_MAX_SIDE)
+    return {
+        "manipulation_score": refined_score_np(prob_map),
+        "manip_heatmap": heatmap,
+        "patch_score": float(np.mean(prob_map)),
+        "patch_heatmap": heatmap,
+    }
+
+
+def predict_mvss_tiled(model, image_rgb: np.ndarray, suppression_mask: Optional[np.ndarray] = None,
+                       overlap: int = 128, batch_size: int = 4, max_side: Optional[int] = None) -> dict:
+    """
+    Зшита карта ймовірностей маніпуляції для HxWx3 uint8 зображення.
+    suppression_mask — маска облич будь-якого розміру (масштабується до карти).
+    Повертає ті самі поля, що й predict_mvss_batch.
+    """
+    rgb = _working_image(image_rgb, max_side)
+    acc, weight = _run_tiles(model, rgb, _tile_grid(*rgb.shape[:2], overlap), batch_size)
+    return _finish(np.divide(acc, weight, out=acc), suppression_mask)
+
+
+class MVSSCascade:
+    """
+    Уточнення грубої карти 512 на повній роздільності: тайли сітки
+    predict_mvss_tiled, у межах яких груба ймовірність > threshold,
+    проганяються батчами і вставляються замість грубих значень.
+    """
+
+    def __init__(self, threshold: float, overlap: int, batch_size: int, max_side: Optional[int]):
+        self.threshold = threshold
+        self.overlap = overlap
+        self.batch_size = batch_size
+        self.max_side = max_side
+        self._lock = threading.Lock()
+        self._images = 0
+        self._refined_images = 0
+        self._crops = 0
+
+    def suspicious_tiles(self, coarse: np.ndarray, h: int, w: int) -> List[Tuple[int, int]]:
+        """Тайли повнорозмірної сітки, де груба карта (будь-якого розміру) перевищує поріг."""
+        ch, cw = coarse.shape
+        hot = coarse > self.threshold
+        if not hot.any():
+            return []
+        selected = []
+        for y, x in _tile_grid(h, w, self.overlap):
+            y1, y2 = y * ch // h, -(-(y + TILE_SIZE) * ch // h)
+            x1, x2 = x * cw // w, -(-(x + TILE_SIZE) * cw // w)
+            if hot[y1:y2, x1:x2].any():
+                selected.append((y, x))
+        return selected
+
+    def refine(self, model, image_rgb: np.ndarray, coarse: np.ndarray,
+               suppression_mask: Optional[np.ndarray] = None) -> dict:
+        """
+        coarse — карта глобального проходу (manip_heatmap predict_mvss_batch,
+        уже з придушеними обличчями). Повертає поля predict_mvss_batch
+        і refine_crops — кількість уточнених тайлів.
+        """
+        rgb = _working_image(image_rgb, self.max_side)
+        h, w = rgb.shape[:2]
+        origins = self.suspicious_tiles(coarse, h, w)
+
+        prob_map = cv2.resize(np.asarray(coarse, dtype=np.float32), (w, h), interpolation=cv2.INTER_LINEAR)
+        if origins:
+            acc, weight = _run_tiles(model, rgb, origins, self.batch_size)
+            refined = weight > 0
+            prob_map[refined] = acc[refined] / weight[refined]
+
+        with self._lock:
+            self._images += 1
+            self._refined_images += bool(origins)
+            self._crops += len(origins)
+
+        result = _finish(prob_map, suppression_mask)
+        result["refine_crops"] = len(origins)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "threshold": self.threshold,
+                "images": self._images,
+                "refined_images": self._refined_images,
+                "refine_crops": self._crops,
+                "avg_crops_per_image": (self._crops / self._images) if self._images else None,
+            }
+
+
+@lru_cache(maxsize=1)
+def get_mvss_cascade() -> MVSSCascade:
+    cascade = MVSSCascade(
+        threshold=serving_config.MVSS_CASCADE_THRESHOLD,
+        overlap=serving_config.MVSS_TILE_OVERLAP,
+        batch_size=serving_config.MVSS_TILE_BATCH,
+        max_side=serving_config.MVSS_TILE_MAX_SIDE,
+    )
+    register_metrics("mvss_cascade", cascade.stats)
+    return cascade
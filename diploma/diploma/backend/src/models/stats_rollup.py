@@ -0,0 +1,61 @@
+# backend/src/models/stats_rollup.py
+
+from sqlalchemy import Column, Integer, Float, Date, ForeignKey
+
+from backend.src.db import Base
+
+FUSION_BINS = 10
+
+
+def _counter():
+    return Column(Integer, nullable=False, default=0, server_default="0")
+
+
+def _sum():
+    return Column(Float, nullable=False, default=0.0, server_default="0")
+
+
+class StatsDaily(Base):
+    """Щоденні агрегати для адмін-панелі (оновлюються інкрементально)."""
+    __tablename__ = "stats_daily"
+
+    day = Column(Date, primary_key=True)
+
+    users_registered = _counter()
+    images_count = _counter()
+
+    ai_sum = _sum()
+    ai_count = _counter()
+    manip_sum = _sum()
+    manip_count = _counter()
+    patch_sum = _sum()
+    patch_count = _counter()
+    meta_sum = _sum()
+    meta_count = _counter()
+    fusion_sum = _sum()
+    fusion_count = _counter()
+
+    fusion_low = _counter()
+    fusion_mid = _counter()
+    fusion_high = _counter()
+
+    fusion_bin_0 = _counter()
+    fusion_bin_1 = _counter()
+    fusion_bin_2 = _counter()
+    fusion_bin_3 = _counter()
+    fusion_bin_4 = _counter()
+    fusion_bin_5 = _counter()
+    fusion_bin_6 = _counter()
+    fusion_bin_7 = _counter()
+    fusion_bin_8 = _counter()
+    fusion_bin_9 = _counter()
+
+
+class StatsUserDaily(Base):
+    """Кількість аналізів на користувача за день."""
+    __tablename__ = "stats_user_daily"
+
+    day = Column(Date, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True, index=True)
+
+    images_count = _counter()
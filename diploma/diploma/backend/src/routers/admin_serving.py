@@ -0,0 +1,24 @@
+# backend/src/routers/admin_serving.py
+
+from datetime import datetime
+
+from fastapi import APIRouter, Depends
+
+from backend.src.auth.dependencies import get_current_admin
+from backend.src.models.user import User
+from backend.src.serving.metrics import collect_metrics
+
+router = APIRouter(prefix="/admin", tags=["admin-serving"])
+
+
+@router.get("/serving-metrics")
+def admin_serving_metrics(
+        admin_user: User = Depends(get_current_admin),
+):
+    """
+    Лічильники серверного інференсу (черги, розміри батчів тощо).
+    """
+    return {
+        "generated_at": datetime.now().isoformat() + "Z",
+        "metrics": collect_metrics(),
+    }
@@ -1,27 +1,20 @@
 # backend/src/routers/admin_stats.py
-import json
-from datetime import datetime, timedelta
-from typing import Any, Dict
+from datetime import datetime, timedelta, timezone
 
 from fastapi import APIRouter, Depends
-from sqlalchemy import func
+from sqlalchemy import case, func
 from sqlalchemy.orm import Session
 
 from backend.src.auth.dependencies import get_current_admin
 from backend.src.db import get_db
-from backend.src.models.image_history import ImageHistory
+from backend.src.models.stats_rollup import FUSION_BINS, StatsDaily, StatsUserDaily
 from backend.src.models.user import User
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
 
-def parse_analysis_raw(raw: str | None) -> Dict[str, Any]:
-    if not raw:
-        return {}
-    try:
-        return json.loads(raw)
-    except Exception:
-        return {}
+def _avg(total, count) -> float | None:
+    return float(total) / count if count else None
 
 
 @router.get("/overview")
@@ -31,91 +24,67 @@ def admin_overview(
 ):
     """
     Адмінська зведена статистика по користувачах і зображеннях.
+    Читає щоденні агрегати (stats_daily / stats_user_daily), а не сиру історію.
     """
-    now = datetime.utcnow()
-    week_ago = now - timedelta(days=7)
-    month_ago = now - timedelta(days=30)
+    today = datetime.now(timezone.utc).date()
+    week_ago = today - timedelta(days=7)
+    month_ago = today - timedelta(days=30)
+
+    def _since(column, since):
+        return func.coalesce(func.sum(case((StatsDaily.day >= since, column), else_=0)), 0)
 
     # --- КОРИСТУВАЧІ ---
     total_users = db.query(func.count(User.id)).scalar() or 0
-    users_last_week = db.query(func.count(User.id)).filter(User.created_at >= week_ago).scalar() or 0
-    users_last_month = db.query(func.count(User.id)).filter(User.created_at >= month_ago).scalar() or 0
-
-    # --- ЗОБРАЖЕННЯ ---
-    total_images = db.query(func.count(ImageHistory.id)).scalar() or 0
-    images_last_week = db.query(func.count(ImageHistory.id)).filter(ImageHistory.created_at >= week_ago).scalar() or 0
-    images_last_month = db.query(func.count(ImageHistory.id)).filter(ImageHistory.created_at >= month_ago).scalar() or 0
-    rows = db.query(ImageHistory).all()
-
-    sum_ai = sum_manip = sum_patch = sum_meta = sum_fusion = 0.0
-    c_ai = c_manip = c_patch = c_meta = c_fusion = 0
-
-    low = mid = high = 0  # за fusion
-
-    fusion_bins = [0] * 10
-
-    # Кількість зображень на користувача
-    user_image_counts: dict[int, int] = {}
 
-    for r in rows:
-        data = parse_analysis_raw(r.analysis_raw)
-        ai = data.get("ai_score")
-        manip = data.get("manipulation_score")
-        patch = data.get("patch_score")
-        meta = data.get("metadata_score")
-        fusion = data.get("fusion_score")
-
-        if ai is not None:
-            sum_ai += float(ai)
-            c_ai += 1
-        if manip is not None:
-            sum_manip += float(manip)
-            c_manip += 1
-        if patch is not None:
-            sum_patch += float(patch)
-            c_patch += 1
-        if meta is not None:
-            sum_meta += float(meta)
-            c_meta += 1
-        if fusion is not None:
-            fusion = float(fusion)
-            sum_fusion += fusion
-            c_fusion += 1
-
-            if fusion < 0.3:
-                low += 1
-            elif fusion < 0.7:
-                mid += 1
-            else:
-                high += 1
-
-            # бінування
-            idx = int(min(fusion * 10, 9))
-            fusion_bins[idx] += 1
-
-        # лічильник по користувачах
-        if r.user_id:
-            user_image_counts[r.user_id] = user_image_counts.get(r.user_id, 0) + 1
-
-    def avg(sum_val, count):
-        return (sum_val / count) if count else None
+    sum_cols = [
+        StatsDaily.images_count,
+        StatsDaily.ai_sum, StatsDaily.ai_count,
+        StatsDaily.manip_sum, StatsDaily.manip_count,
+        StatsDaily.patch_sum, StatsDaily.patch_count,
+        StatsDaily.meta_sum, StatsDaily.meta_count,
+        StatsDaily.fusion_sum, StatsDaily.fusion_count,
+        StatsDaily.fusion_low, StatsDaily.fusion_mid, StatsDaily.fusion_high,
+        *[getattr(StatsDaily, f"fusion_bin_{i}") for i in range(FUSION_BINS)],
+    ]
+    agg = db.query(
+        _since(StatsDaily.users_registered, week_ago),
+        _since(StatsDaily.users_registered, month_ago),
+        _since(StatsDaily.images_count, week_ago),
+        _since(StatsDaily.images_count, month_ago),
+        *[func.coalesce(func.sum(c), 0) for c in sum_cols],
+    ).one()
+
+    users_last_week, users_last_month, images_last_week, images_last_month = (int(v) for v in agg[:4])
+    (total_images,
+     ai_sum, ai_count, manip_sum, manip_count, patch_sum, patch_count,
+     meta_sum, meta_count, fusion_sum, fusion_count,
+     low, mid, high) = agg[4:18]
+    fusion_bins = [int(c) for c in agg[18:]]
 
     # топ користувачів за кількістю зображень
-    top_users_data = (
-        db.query(User)
-        .filter(User.id.in_(user_image_counts.keys()))
+    images_count = func.sum(StatsUserDaily.images_count).label("images_count")
+    top = (
+        db.query(StatsUserDaily.user_id, images_count)
+        .group_by(StatsUserDaily.user_id)
+        .order_by(images_count.desc())
+        .limit(5)
+        .subquery()
+    )
+    top_rows = (
+        db.query(User.id, User.email, User.full_name, top.c.images_count)
+        .join(top, top.c.user_id == User.id)
+        .order_by(top.c.images_count.desc())
         .all()
     )
-    top_users = []
-    for u in top_users_data:
-        top_users.append({
-            "user_id": u.id,
-            "email": u.email,
-            "full_name": u.full_name,
-            "images_count": user_image_counts.get(u.id, 0),
-        })
-    top_users.sort(key=lambda x: x["images_count"], reverse=True)
-    top_users = top_users[:5]
+    top_users = [
+        {
+            "user_id": r.id,
+            "email": r.email,
+            "full_name": r.full_name,
+            "images_count": int(r.images_count),
+        }
+        for r in top_rows
+    ]
 
     return {
         "users": {
@@ -124,21 +93,21 @@ def admin_overview(
             "last_month": users_last_month,
         },
         "images": {
-            "total": total_images,
+            "total": int(total_images),
             "last_week": images_last_week,
             "last_month": images_last_month,
         },
         "scores": {
-            "avg_ai": avg(sum_ai, c_ai),
-            "avg_manip": avg(sum_manip, c_manip),
-            "avg_patch": avg(sum_patch, c_patch),
-            "avg_meta": avg(sum_meta, c_meta),
-            "avg_fusion": avg(sum_fusion, c_fusion),
+            "avg_ai": _avg(ai_sum, ai_count),
+            "avg_manip": _avg(manip_sum, manip_count),
+            "avg_patch": _avg(patch_sum, patch_count),
+            "avg_meta": _avg(meta_sum, meta_count),
+            "avg_fusion": _avg(fusion_sum, fusion_count),
         },
         "fusion_distribution": {
-            "low": low,
-            "mid": mid,
-            "high": high,
+            "low": int(low),
+            "mid": int(mid),
+            "high": int(high),
             "bins": fusion_bins,
         },
         "top_users_by_images": top_users,
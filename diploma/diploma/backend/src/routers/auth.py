@@ -1,3 +1,5 @@
+from datetime import datetime, timezone
+
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
@@ -6,6 +8,7 @@ from backend.src.auth.utils import hash_password, verify_password, create_access
 from backend.src.db import get_db
 from backend.src.models.user import User
 from backend.src.schemas.user import UserCreate, UserLogin, UserOut
+from backend.src.utils.stats_rollup import record_registration
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -23,8 +26,10 @@ def register_user(user_in: UserCreate, db: Session = Depends(get_db)):
         email=user_in.email,
         full_name=user_in.full_name,
         password_hash=hash_password(user_in.password),
+        created_at=datetime.now(timezone.utc),
     )
     db.add(user)
+    record_registration(db, user.created_at)
     db.commit()
     db.refresh(user)
     return user
@@ -1,8 +1,8 @@
 # backend/src/routers/history.py
 
-from typing import List
+from typing import List, Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
 
 from backend.src.auth.dependencies import get_current_user
@@ -10,6 +10,8 @@ from backend.src.db import get_db
 from backend.src.models.image_history import ImageHistory
 from backend.src.models.user import User
 from backend.src.schemas.image_history import ImageHistoryRead
+from backend.src.utils.heatmap_codec import render_response
+from backend.src.utils.heatmap_store import get_heatmap_store
 
 router = APIRouter(prefix="/history", tags=["history"])
 
@@ -41,3 +43,29 @@ def get_history_item(
     if item is None or item.user_id != current_user.id:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Запис не знайдено")
     return item
+
+
+@router.get("/{item_id}/heatmaps")
+def get_history_heatmaps(
+        item_id: int,
+        heatmap_format: Literal["json", "png", "f16"] = Query("json"),
+        heatmap_size: Optional[int] = Query(None, ge=8, le=1024),
+        db: Session = Depends(get_db),
+        current_user: User = Depends(get_current_user),
+):
+    """
+    Heatmap запису історії — читаються зі сховища лише на запит.
+    Формати ті самі, що й у /analyze_full.
+    """
+    item = db.query(ImageHistory).filter(ImageHistory.id == item_id).first()
+    if item is None or item.user_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Запис не знайдено")
+    if not item.heatmaps_key:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Для цього запису heatmap не збережено")
+
+    try:
+        heatmaps = get_heatmap_store().get(item.heatmaps_key)
+    except FileNotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Файл heatmap не знайдено у сховищі")
+
+    return render_response({"heatmaps": heatmaps}, heatmap_format, heatmap_size)
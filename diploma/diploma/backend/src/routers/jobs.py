@@ -0,0 +1,104 @@
+# backend/src/routers/jobs.py
+#
+# Асинхронний аналіз: POST /jobs ставить файл у чергу, GET /jobs/{id}
+# повертає стан і (після завершення) результат. Обробляють воркери
+# python -m backend.job_worker — окремо від API.
+
+import json
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Response, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session, undefer
+
+from backend.src.auth.dependencies import get_current_user_optional
+from backend.src.db import get_db
+from backend.src.models.analysis_job import JOB_DONE, AnalysisJob
+from backend.src.models.user import User
+from backend.src.serving import config as serving_config
+from backend.src.serving.job_queue import enqueue_job
+from backend.src.utils.upload_store import UploadTooLargeError, get_upload_store
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+
+def _job_info(job: AnalysisJob) -> dict:
+    return {
+        "id": job.id,
+        "status": job.status,
+        "mode": job.mode,
+        "filename": job.filename,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        "queue_ms": job.queue_ms,
+        "run_ms": job.run_ms,
+        "cache": job.cache,
+        "error": job.error,
+        "history_id": job.history_id,
+    }
+
+
+@router.post("", status_code=status.HTTP_202_ACCEPTED)
+async def submit_job(
+        file: UploadFile = File(...),
+        mode: Literal["full", "scores"] = Query("full"),
+        heatmap_format: Literal["json", "png", "f16"] = Query("json"),
+        heatmap_size: Optional[int] = Query(None, ge=8, le=1024),
+        db: Session = Depends(get_db),
+        current_user: Optional[User] = Depends(get_current_user_optional),
+):
+    """Ставить файл у чергу аналізу. Параметри — як у /analyze_full."""
+    # Файл копіюється у сховище частинами, у пам'ять повністю не читається
+    store = get_upload_store()
+    try:
+        payload_key, file_size = await run_in_threadpool(
+            store.put, file.file, serving_config.JOB_MAX_UPLOAD_MB * 1024 * 1024,
+        )
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+
+    try:
+        job = await run_in_threadpool(
+            enqueue_job,
+            db,
+            user_id=current_user.id if current_user is not None else None,
+            filename=file.filename or "unnamed",
+            mime_type=file.content_type,
+            payload_key=payload_key,
+            file_size=file_size,
+            mode=mode,
+            heatmap_format=heatmap_format,
+            heatmap_size=heatmap_size,
+            max_attempts=serving_config.JOB_MAX_ATTEMPTS,
+        )
+    except BaseException:
+        store.delete(payload_key)
+        raise
+    return {"id": job.id, "status": job.status}
+
+
+@router.get("/{job_id}")
+def get_job(
+        job_id: str,
+        db: Session = Depends(get_db),
+        current_user: Optional[User] = Depends(get_current_user_optional),
+):
+    """Стан завдання; для завершених — поле "result" (як відповідь /analyze_full)."""
+    job = (
+        db.query(AnalysisJob)
+        .options(undefer(AnalysisJob.result_json))
+        .filter(AnalysisJob.id == job_id)
+        .first()
+    )
+    # Завдання користувача бачить лише він; анонімні — будь-хто, хто знає id
+    if job is None or (job.user_id is not None and (current_user is None or current_user.id != job.user_id)):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Завдання не знайдено")
+
+    content = json.dumps(_job_info(job))
+    if job.status == JOB_DONE and job.result_json:
+        # результат уже серіалізований воркером — вставляємо як є
+        content = content[:-1] + ', "result": ' + job.result_json + "}"
+    return Response(content=content, media_type="application/json")
@@ -20,6 +20,7 @@ class ImageHistoryCreate(ImageHistoryBase):
 class ImageHistoryRead(ImageHistoryBase):
     id: int
     created_at: datetime
+    heatmaps_key: Optional[str] = None
 
     class Config:
         orm_mode = True
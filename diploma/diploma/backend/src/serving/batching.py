@@ -0,0 +1,150 @@
+# backend/src/serving/batching.py
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Sequence
+
+from backend.src.serving.metrics import register_metrics
+
+
+class _Pending:
+    __slots__ = ("item", "future", "enqueued_at")
+
+    def __init__(self, item: Any):
+        self.item = item
+        self.future: Future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class MicroBatcher:
+    """
+    Збирає одночасні запити в один батч і виконує batch_fn одним викликом.
+
+    Батч відправляється, щойно набрано max_batch_size елементів або коли
+    найстаріший запит чекає довше за max_wait_ms. batch_fn отримує список
+    елементів і повертає список результатів у тому ж порядку.
+
+    workers > 1 — кілька батчів виконуються паралельно (batch_fn має бути
+    потокобезпечною); батч при цьому збирає один потік за раз.
+    """
+
+    def __init__(
+            self,
+            name: str,
+            batch_fn: Callable[[List[Any]], Sequence[Any]],
+            max_batch_size: int = 8,
+            max_wait_ms: float = 5.0,
+            workers: int = 1,
+    ):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait_s = max(0.0, float(max_wait_ms)) / 1000.0
+
+        self._queue: deque[_Pending] = deque()
+        self._cond = threading.Condition()
+        self._collect_lock = threading.Lock()
+
+        # ---- лічильники ----
+        self._submitted = 0
+        self._batches = 0
+        self._items = 0
+        self._errors = 0
+        self._max_queue_depth = 0
+        self._batch_size_hist: Dict[int, int] = {}
+        self._wait_ms_total = 0.0
+        self._run_ms_total = 0.0
+        self._last_batch_size = 0
+
+        self._threads = [
+            threading.Thread(target=self._loop, name=f"batcher-{name}-{i}", daemon=True)
+            for i in range(max(1, int(workers)))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+        register_metrics(f"batcher:{name}", self.stats)
+
+    def submit(self, item: Any) -> Future:
+        pending = _Pending(item)
+        with self._cond:
+            self._queue.append(pending)
+            self._submitted += 1
+            self._max_queue_depth = max(self._max_queue_depth, len(self._queue))
+            self._cond.notify()
+        return pending.future
+
+    def __call__(self, item: Any) -> Any:
+        return self.submit(item).result()
+
+    def _next_batch(self) -> List[_Pending]:
+        with self._collect_lock, self._cond:
+            while not self._queue:
+                self._cond.wait()
+
+            deadline = self._queue[0].enqueued_at + self.max_wait_s
+            while len(self._queue) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            n = min(len(self._queue), self.max_batch_size)
+            return [self._queue.popleft() for _ in range(n)]
+
+    def _loop(self) -> None:
+        while True:
+            batch = self._next_batch()
+            started = time.perf_counter()
+            try:
+                results = self.batch_fn([p.item for p in batch])
+                if len(results) != len(batch):
+                    raise RuntimeError(
+                        f"MicroBatcher[{self.name}]: batch_fn повернула {len(results)} результатів "
+                        f"для батчу з {len(batch)} елементів."
+                    )
+            except Exception as e:
+                with self._cond:
+                    self._errors += 1
+                for p in batch:
+                    p.future.set_exception(e)
+                continue
+            finally:
+                self._record(batch, started)
+
+            for p, res in zip(batch, results):
+                p.future.set_result(res)
+
+    def _record(self, batch: List[_Pending], started: float) -> None:
+        now = time.perf_counter()
+        size = len(batch)
+        with self._cond:
+            self._batches += 1
+            self._items += size
+            self._last_batch_size = size
+            self._batch_size_hist[size] = self._batch_size_hist.get(size, 0) + 1
+            self._wait_ms_total += sum(started - p.enqueued_at for p in batch) * 1000.0
+            self._run_ms_total += (now - started) * 1000.0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            batches = self._batches
+            items = self._items
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait_s * 1000.0,
+                "workers": len(self._threads),
+                "queue_depth": len(self._queue),
+                "max_queue_depth": self._max_queue_depth,
+                "submitted": self._submitted,
+                "batches": batches,
+                "items": items,
+                "errors": self._errors,
+                "last_batch_size": self._last_batch_size,
+                "avg_batch_size": (items / batches) if batches else None,
+                "avg_wait_ms": (self._wait_ms_total / items) if items else None,
+                "avg_batch_run_ms": (self._run_ms_total / batches) if batches else None,
+                "batch_size_hist": {str(k): v for k, v in sorted(self._batch_size_hist.items())},
+            }
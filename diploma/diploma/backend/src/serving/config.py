@@ -0,0 +1,133 @@
+# backend/src/serving/config.py
+#
+# Параметри серверного інференсу. Кожне значення можна перевизначити
+# змінною оточення з тією ж назвою.
+
+import os
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+# ==== Мікробатчинг AI-детектора (ViT) ====
+AI_BATCH_MAX_SIZE = _env_int("AI_BATCH_MAX_SIZE", 8)
+AI_BATCH_MAX_WAIT_MS = _env_float("AI_BATCH_MAX_WAIT_MS", 5.0)
+# Паралельні батчі ViT (Grad-CAM не тримає стану на об'єкті, глобальне блокування не потрібне)
+AI_BATCH_WORKERS = _env_int("AI_BATCH_WORKERS", 2)
+
+# ==== Мікробатчинг детектора маніпуляцій (MVSSNet) ====
+MVSS_BATCH_MAX_SIZE = _env_int("MVSS_BATCH_MAX_SIZE", 4)
+MVSS_BATCH_MAX_WAIT_MS = _env_float("MVSS_BATCH_MAX_WAIT_MS", 10.0)
+# 1 — інференс-версія MVSSNet (лише x0, без гілки Sobel/ERB, BN згорнуто в conv)
+MVSS_INFERENCE_OPTIMIZED = _env_int("MVSS_INFERENCE_OPTIMIZED", 1)
+# Position attention DA-head блоками запитів: пам'ять ~ блок x (H/8 * W/8) на
+# зображення замість квадратної матриці (4096 x 4096 на вході 512). 0 — повна матриця
+MVSS_ATTENTION_BLOCK_SIZE = _env_int("MVSS_ATTENTION_BLOCK_SIZE", 1024)
+
+# ==== Режим MVSSNet для великих зображень ====
+# resize  — усе зображення стискається до 512x512 (один прохід);
+# tiled   — тайли 512 з перекриттям на повній роздільності;
+# cascade — прохід 512, потім тайли повної роздільності лише там,
+#           де груба ймовірність > MVSS_CASCADE_THRESHOLD
+MVSS_MODE = os.getenv("MVSS_MODE", "resize")
+# Довша сторона зображення перед нарізкою (0 — без обмеження)
+MVSS_TILE_MAX_SIDE = _env_int("MVSS_TILE_MAX_SIDE", 2048)
+MVSS_TILE_OVERLAP = _env_int("MVSS_TILE_OVERLAP", 128)
+# Тайлів за один forward — обмежує пам'ять незалежно від розміру зображення
+MVSS_TILE_BATCH = _env_int("MVSS_TILE_BATCH", 4)
+# Нижче за поріг бінаризації маски (0.5): дрібні вклейки на грубій карті розмиті
+MVSS_CASCADE_THRESHOLD = _env_float("MVSS_CASCADE_THRESHOLD", 0.3)
+
+# ==== Паралельний DAG етапів analyze_full ====
+PIPELINE_WORKERS = _env_int("PIPELINE_WORKERS", 8)
+
+# ==== Виконавець інференсу (поза потоками запитів FastAPI) ====
+INFERENCE_WORKERS = _env_int("INFERENCE_WORKERS", 2)
+INFERENCE_QUEUE_SIZE = _env_int("INFERENCE_QUEUE_SIZE", 16)
+INFERENCE_RETRY_AFTER_S = _env_int("INFERENCE_RETRY_AFTER_S", 5)
+
+# 0 — залишити значення torch за замовчуванням
+TORCH_NUM_THREADS = _env_int("TORCH_NUM_THREADS", 0)
+TORCH_NUM_INTEROP_THREADS = _env_int("TORCH_NUM_INTEROP_THREADS", 0)
+
+# ==== Бекенд інференсу ====
+# torch | onnx — ONNX Runtime на CPU для forward ViT і MVSSNet (Grad-CAM лишається
+# на torch); без onnxruntime або експортованих моделей — torch
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "torch")
+ONNX_MODELS_DIR = os.getenv("ONNX_MODELS_DIR", "backend/models/onnx")
+# 0 — значення ORT за замовчуванням
+ORT_INTRA_OP_THREADS = _env_int("ORT_INTRA_OP_THREADS", 0)
+ORT_INTER_OP_THREADS = _env_int("ORT_INTER_OP_THREADS", 0)
+
+# ==== Кеш результатів аналізу ====
+RESULT_CACHE_MEMORY_MB = _env_int("RESULT_CACHE_MEMORY_MB", 256)
+# Порожній рядок вимикає дисковий рівень
+RESULT_CACHE_DB_PATH = os.getenv("RESULT_CACHE_DB_PATH", "backend/cache/analysis_cache.sqlite3")
+# Обсяг дискового рівня (значення результатів); понад нього витісняються
+# найстаріші записи. 0 — без обмеження
+RESULT_CACHE_DISK_MB = _env_int("RESULT_CACHE_DISK_MB", 2048)
+
+# ==== Пошук майже-дублікатів за перцептивним хешем ====
+# Вимкнено за замовчуванням. Від збігу береться лише оцінка AI-детектора;
+# MVSS завжди рахується заново (локальна вклейка майже не змінює pHash)
+NEAR_DUP_ENABLED = _env_int("NEAR_DUP_ENABLED", 0) == 1
+# Максимальна відстань Геммінга між 64-бітними pHash
+NEAR_DUP_RADIUS = _env_int("NEAR_DUP_RADIUS", 6)
+# Найбільше хешів в індексі (витісняються найстаріші); 0 — без обмеження
+NEAR_DUP_MAX_ENTRIES = _env_int("NEAR_DUP_MAX_ENTRIES", 100000)
+
+# ==== Ранній вихід між детекторами (за межами fusion_predict) ====
+# Детектори запускаються від дешевшого до дорожчого; решта пропускається,
+# коли підсумкова оцінка вже не може перетнути поріг рішення
+EARLY_EXIT_ENABLED = _env_int("EARLY_EXIT_ENABLED", 0) == 1
+EARLY_EXIT_THRESHOLD = _env_float("EARLY_EXIT_THRESHOLD", 0.5)
+
+# ==== Сховище heatmap для історії ====
+HEATMAP_STORE_DIR = os.getenv("HEATMAP_STORE_DIR", "backend/storage/heatmaps")
+
+# ==== Пакетний аналіз /analyze_batch ====
+BATCH_MAX_FILES = _env_int("BATCH_MAX_FILES", 64)
+# Сумарний (розпакований) розмір зображень в одному запиті
+BATCH_MAX_TOTAL_MB = _env_int("BATCH_MAX_TOTAL_MB", 256)
+# Паралельні аналізи пакету: стільки зображень одночасно потрапляють
+# у мікробатчі ViT/MVSS
+BATCH_WORKERS = _env_int("BATCH_WORKERS", 8)
+BATCH_QUEUE_SIZE = _env_int("BATCH_QUEUE_SIZE", 64)
+# Скільки рядків історії накопичувати перед записом у БД
+BATCH_HISTORY_FLUSH = _env_int("BATCH_HISTORY_FLUSH", 16)
+
+# ==== Черга завдань /jobs (воркери: python -m backend.job_worker) ====
+JOB_MAX_UPLOAD_MB = _env_int("JOB_MAX_UPLOAD_MB", 50)
+# Файли завдань (до завершення). Для воркерів на інших вузлах — спільний каталог
+JOB_UPLOAD_DIR = os.getenv("JOB_UPLOAD_DIR", "backend/storage/uploads")
+JOB_MAX_ATTEMPTS = _env_int("JOB_MAX_ATTEMPTS", 3)
+# Оренда завдання воркером; heartbeat продовжує її кожну третину строку
+JOB_LEASE_S = _env_float("JOB_LEASE_S", 120.0)
+JOB_RETRY_BACKOFF_S = _env_float("JOB_RETRY_BACKOFF_S", 10.0)
+JOB_POLL_INTERVAL_S = _env_float("JOB_POLL_INTERVAL_S", 1.0)
+# Потоки одного процесу воркера (їхні запити об'єднуються мікробатчером)
+JOB_WORKER_THREADS = _env_int("JOB_WORKER_THREADS", 2)
+
+# ==== Декодування завантажень ====
+# Бюджет пікселів зображення після зменшеного (DCT) декодування
+IMAGE_MAX_MEGAPIXELS = _env_float("IMAGE_MAX_MEGAPIXELS", 64.0)
+# Файли з ZIP-архівів понад цей розмір тримаються на диску, а не в пам'яті
+UPLOAD_SPOOL_MB = _env_int("UPLOAD_SPOOL_MB", 4)
+
+# ==== Маска придушення облич (MVSS) ====
+FACE_DETECTOR = os.getenv("FACE_DETECTOR", "haar")
+# fast / balanced / accurate (accurate — пошук на повних 512x512)
+FACE_DETECT_QUALITY = os.getenv("FACE_DETECT_QUALITY", "balanced")
+# Кількість зображень, для яких зберігаються знайдені рамки облич
+FACE_MASK_CACHE_SIZE = _env_int("FACE_MASK_CACHE_SIZE", 1024)
@@ -0,0 +1,75 @@
+# backend/src/serving/early_exit.py
+#
+# Каскад детекторів із раннім виходом. fusion_predict монотонно не спадає
+# за кожною оцінкою, тож для ще не обчислених детекторів межі підсумкової
+# оцінки дають підстановки 0 (нижня) та 1 (верхня). Групи етапів
+# виконуються від дешевшої до дорожчої (за виміряним часом); щойно обидві
+# межі по один бік порогу рішення, решта детекторів пропускається.
+
+import threading
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from backend.src.fusion.fusion import fusion_predict
+
+# Оцінки, які дає кожна група етапів
+GROUP_SCORES: Dict[str, Tuple[str, ...]] = {
+    "metadata": ("metadata_score",),
+    "ai": ("ai_score",),
+    "mvss": ("manipulation_score", "patch_score"),
+}
+
+# Початкові оцінки вартості (мс) до перших вимірів
+DEFAULT_COSTS_MS = {"metadata": 1.0, "ai": 50.0, "mvss": 500.0}
+COST_EMA_ALPHA = 0.1
+
+
+def fusion_bounds(known: Mapping[str, Optional[float]]) -> Tuple[float, float]:
+    """(мінімум, максимум) fusion_predict за відомих оцінок; невідомі — від 0 до 1."""
+    def with_default(default: float) -> float:
+        return fusion_predict(**{
+            name: default if known.get(name) is None else float(known[name])
+            for names in GROUP_SCORES.values() for name in names
+        })
+
+    return with_default(0.0), with_default(1.0)
+
+
+class EarlyExitCascade:
+    def __init__(self, threshold: float):
+        self.threshold = threshold
+        self._costs = dict(DEFAULT_COSTS_MS)
+        self._lock = threading.Lock()
+        self._images = 0
+        self._exits: Dict[str, int] = {}
+        self._skipped: Dict[str, int] = {}
+
+    def order(self) -> List[str]:
+        with self._lock:
+            return sorted(self._costs, key=self._costs.get)
+
+    def record_cost(self, group: str, ms: float) -> None:
+        with self._lock:
+            self._costs[group] += COST_EMA_ALPHA * (ms - self._costs[group])
+
+    def decided(self, known: Mapping[str, Optional[float]]) -> bool:
+        """Підсумок уже не може перетнути поріг, хоч би що дали решта детекторів."""
+        low, high = fusion_bounds(known)
+        return low >= self.threshold or high < self.threshold
+
+    def record_exit(self, after: str, skipped: List[str]) -> None:
+        with self._lock:
+            self._images += 1
+            if skipped:
+                self._exits[after] = self._exits.get(after, 0) + 1
+            for group in skipped:
+                self._skipped[group] = self._skipped.get(group, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "threshold": self.threshold,
+                "images": self._images,
+                "exits_after": dict(self._exits),
+                "skipped": dict(self._skipped),
+                "cost_ms": {group: round(ms, 2) for group, ms in self._costs.items()},
+            }
@@ -0,0 +1,121 @@
+# backend/src/serving/executor.py
+
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict
+
+import torch
+
+from backend.src.serving.metrics import register_metrics
+
+
+class QueueFullError(RuntimeError):
+    """Черга інференсу заповнена — запит слід повторити пізніше."""
+
+
+def configure_torch_threads(intra_op: int, inter_op: int) -> None:
+    """
+    Обмежує кількість потоків torch, щоб воркери інференсу не
+    конкурували за ядра. 0 — залишити значення torch за замовчуванням.
+    """
+    if intra_op > 0:
+        torch.set_num_threads(intra_op)
+    if inter_op > 0:
+        try:
+            torch.set_num_interop_threads(inter_op)
+        except RuntimeError:
+            # interop-пул уже ініціалізований — змінити його не можна
+            pass
+
+
+class InferenceExecutor:
+    """
+    Фіксований набір потоків для роботи з моделями і обмежена черга
+    перед ними. Коли черга заповнена, submit кидає QueueFullError
+    замість того, щоб затримка необмежено зростала.
+    """
+
+    def __init__(self, name: str, workers: int, queue_size: int):
+        self.name = name
+        self.workers = max(1, int(workers))
+        self.queue_size = max(1, int(queue_size))
+        self._queue: queue.Queue = queue.Queue(maxsize=self.queue_size)
+
+        self._lock = threading.Lock()
+        self._accepted = 0
+        self._rejected = 0
+        self._completed = 0
+        self._failed = 0
+        self._busy = 0
+        self._wait_ms_total = 0.0
+        self._run_ms_total = 0.0
+
+        self._threads = [
+            threading.Thread(target=self._loop, name=f"{name}-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for t in self._threads:
+            t.start()
+
+        register_metrics(f"executor:{name}", self.stats)
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        fut: Future = Future()
+        try:
+            self._queue.put_nowait((fut, fn, args, kwargs, time.perf_counter()))
+        except queue.Full:
+            with self._lock:
+                self._rejected += 1
+            raise QueueFullError(f"InferenceExecutor[{self.name}]: черга заповнена ({self.queue_size}).") from None
+        with self._lock:
+            self._accepted += 1
+        return fut
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def _loop(self) -> None:
+        while True:
+            fut, fn, args, kwargs, enqueued_at = self._queue.get()
+            if not fut.set_running_or_notify_cancel():
+                continue
+
+            started = time.perf_counter()
+            with self._lock:
+                self._busy += 1
+                self._wait_ms_total += (started - enqueued_at) * 1000.0
+            try:
+                fut.set_result(fn(*args, **kwargs))
+                ok = True
+            except BaseException as e:
+                fut.set_exception(e)
+                ok = False
+
+            with self._lock:
+                self._busy -= 1
+                self._run_ms_total += (time.perf_counter() - started) * 1000.0
+                if ok:
+                    self._completed += 1
+                else:
+                    self._failed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            finished = self._completed + self._failed
+            return {
+                "workers": self.workers,
+                "queue_size": self.queue_size,
+                "queue_depth": self._queue.qsize(),
+                "busy_workers": self._busy,
+                "accepted": self._accepted,
+                "rejected": self._rejected,
+                "completed": self._completed,
+                "failed": self._failed,
+                "avg_wait_ms": (self._wait_ms_total / finished) if finished else None,
+                "avg_run_ms": (self._run_ms_total / finished) if finished else None,
+                "torch_num_threads": torch.get_num_threads(),
+                "torch_num_interop_threads": torch.get_num_interop_threads(),
+            }
@@ -0,0 +1,232 @@
+# backend/src/serving/job_queue.py
+#
+# Черга завдань аналізу в таблиці analysis_jobs.
+# Захоплення: SELECT ... FOR UPDATE SKIP LOCKED (PostgreSQL) + умовний
+# UPDATE (compare-and-set за attempts) — на SQLite, де FOR UPDATE немає,
+# від подвійного захоплення захищає саме він.
+
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from backend.src.models.analysis_job import JOB_DONE, JOB_FAILED, JOB_QUEUED, JOB_RUNNING, AnalysisJob
+from backend.src.models.image_history import SCORE_COLUMNS, ImageHistory
+from backend.src.utils.stats_rollup import record_analysis
+from backend.src.utils.upload_store import get_upload_store
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _utc(ts: Optional[datetime]) -> Optional[datetime]:
+    """SQLite повертає наївні дати — вважаємо їх UTC."""
+    if ts is not None and ts.tzinfo is None:
+        return ts.replace(tzinfo=timezone.utc)
+    return ts
+
+
+def _ms(start: Optional[datetime], end: Optional[datetime]) -> Optional[float]:
+    if start is None or end is None:
+        return None
+    return (_utc(end) - _utc(start)).total_seconds() * 1000.0
+
+
+def enqueue_job(db: Session, *, user_id: Optional[int], filename: str, mime_type: Optional[str],
+                payload_key: str, file_size: int, mode: str, heatmap_format: str, heatmap_size: Optional[int],
+                max_attempts: int) -> AnalysisJob:
+    now = _now()
+    job = AnalysisJob(
+        id=uuid.uuid4().hex,
+        user_id=user_id,
+        status=JOB_QUEUED,
+        mode=mode,
+        heatmap_format=heatmap_format,
+        heatmap_size=heatmap_size,
+        filename=filename,
+        mime_type=mime_type,
+        file_size_bytes=file_size,
+        payload_key=payload_key,
+        attempts=0,
+        max_attempts=max(1, max_attempts),
+        available_at=now,
+        created_at=now,
+    )
+    db.add(job)
+    db.commit()
+    return job
+
+
+def _delete_payloads(keys) -> None:
+    """Файли завершених завдань (після commit: повтор завдання файл ще потребує)."""
+    store = get_upload_store()
+    for key in keys:
+        if key:
+            store.delete(key)
+
+
+def reap_expired(db: Session) -> int:
+    """Завдання з простроченою орендою, у яких вичерпано спроби, -> failed."""
+    now = _now()
+    expired = and_(
+        AnalysisJob.status == JOB_RUNNING,
+        AnalysisJob.lease_expires_at < now,
+        AnalysisJob.attempts >= AnalysisJob.max_attempts,
+    )
+    keys = [key for (key,) in db.query(AnalysisJob.payload_key).filter(expired)]
+    count = (
+        db.query(AnalysisJob)
+        .filter(expired)
+        .update({
+            AnalysisJob.status: JOB_FAILED,
+            AnalysisJob.error: "Воркер не завершив завдання вчасно (оренда прострочена).",
+            AnalysisJob.finished_at: now,
+            AnalysisJob.lease_owner: None,
+            AnalysisJob.lease_expires_at: None,
+            AnalysisJob.payload_key: None,
+        }, synchronize_session=False)
+    )
+    db.commit()
+    _delete_payloads(keys)
+    return count
+
+
+def claim_job(db: Session, worker_id: str, lease_s: float, max_tries: int = 5) -> Optional[AnalysisJob]:
+    """
+    Бере найстаріше доступне завдання: нове / відкладене після помилки або
+    з простроченою орендою (воркер впав). Повертає None, якщо черга порожня.
+    """
+    for _ in range(max_tries):
+        now = _now()
+        claimable = or_(
+            and_(AnalysisJob.status == JOB_QUEUED, AnalysisJob.available_at <= now),
+            and_(
+                AnalysisJob.status == JOB_RUNNING,
+                AnalysisJob.lease_expires_at < now,
+                AnalysisJob.attempts < AnalysisJob.max_attempts,
+            ),
+        )
+        row = (
+            db.query(AnalysisJob.id, AnalysisJob.attempts)
+            .filter(claimable)
+            .order_by(AnalysisJob.available_at, AnalysisJob.created_at)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .first()
+        )
+        if row is None:
+            db.rollback()
+            return None
+
+        claimed = (
+            db.query(AnalysisJob)
+            .filter(AnalysisJob.id == row.id, AnalysisJob.attempts == row.attempts, claimable)
+            .update({
+                AnalysisJob.status: JOB_RUNNING,
+                AnalysisJob.lease_owner: worker_id,
+                AnalysisJob.lease_expires_at: now + timedelta(seconds=lease_s),
+                AnalysisJob.attempts: AnalysisJob.attempts + 1,
+                AnalysisJob.started_at: now,
+            }, synchronize_session=False)
+        )
+        db.commit()
+        if claimed:
+            return db.get(AnalysisJob, row.id)
+        # інший воркер встиг першим — пробуємо наступне
+    return None
+
+
+def _owned(job_id: str, worker_id: str):
+    return and_(
+        AnalysisJob.id == job_id,
+        AnalysisJob.status == JOB_RUNNING,
+        AnalysisJob.lease_owner == worker_id,
+    )
+
+
+def heartbeat(db: Session, job_id: str, worker_id: str, lease_s: float) -> bool:
+    """Продовжує оренду. False — завдання вже не належить цьому воркеру."""
+    updated = (
+        db.query(AnalysisJob)
+        .filter(_owned(job_id, worker_id))
+        .update({AnalysisJob.lease_expires_at: _now() + timedelta(seconds=lease_s)}, synchronize_session=False)
+    )
+    db.commit()
+    return bool(updated)
+
+
+def complete_job(db: Session, job: AnalysisJob, worker_id: str, cache: str, result_json: str,
+                 history_row: Optional[ImageHistory]) -> bool:
+    """
+    Зберігає результат (і рядок історії з агрегатами) однією транзакцією.
+    False — оренду перехопив інший воркер, результат відкинуто.
+    """
+    now = _now()
+    payload_key = job.payload_key  # після commit атрибути job перечитуються з БД
+    history_id = None
+    if history_row is not None:
+        db.add(history_row)
+        db.flush()
+        history_id = history_row.id
+        record_analysis(db, history_row.user_id, history_row.created_at,
+                        {name: getattr(history_row, name) for name in SCORE_COLUMNS})
+
+    updated = (
+        db.query(AnalysisJob)
+        .filter(_owned(job.id, worker_id))
+        .update({
+            AnalysisJob.status: JOB_DONE,
+            AnalysisJob.finished_at: now,
+            AnalysisJob.queue_ms: _ms(job.created_at, job.started_at),
+            AnalysisJob.run_ms: _ms(job.started_at, now),
+            AnalysisJob.cache: cache,
+            AnalysisJob.result_json: result_json,
+            AnalysisJob.history_id: history_id,
+            AnalysisJob.error: None,
+            AnalysisJob.payload_key: None,
+            AnalysisJob.lease_owner: None,
+            AnalysisJob.lease_expires_at: None,
+        }, synchronize_session=False)
+    )
+    if not updated:
+        db.rollback()
+        return False
+    db.commit()
+    _delete_payloads([payload_key])
+    return True
+
+
+def fail_job(db: Session, job: AnalysisJob, worker_id: str, error: str, backoff_s: float,
+             retryable: bool = True) -> str:
+    """
+    Помилка спроби: повтор із затримкою (backoff * номер спроби) або failed.
+    retryable=False — помилка залежить лише від вхідних даних, повтор дасть те саме.
+    Повертає новий статус.
+    """
+    now = _now()
+    payload_key = job.payload_key
+    if retryable and job.attempts < job.max_attempts:
+        values = {
+            AnalysisJob.status: JOB_QUEUED,
+            AnalysisJob.available_at: now + timedelta(seconds=backoff_s * job.attempts),
+        }
+    else:
+        values = {
+            AnalysisJob.status: JOB_FAILED,
+            AnalysisJob.finished_at: now,
+            AnalysisJob.run_ms: _ms(job.started_at, now),
+            AnalysisJob.payload_key: None,
+        }
+    values.update({
+        AnalysisJob.error: error,
+        AnalysisJob.lease_owner: None,
+        AnalysisJob.lease_expires_at: None,
+    })
+    updated = db.query(AnalysisJob).filter(_owned(job.id, worker_id)).update(values, synchronize_session=False)
+    db.commit()
+    if updated and values[AnalysisJob.status] == JOB_FAILED:
+        _delete_payloads([payload_key])
+    return values[AnalysisJob.status]
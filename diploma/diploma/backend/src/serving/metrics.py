@@ -0,0 +1,26 @@
+# backend/src/serving/metrics.py
+
+import threading
+from typing import Any, Callable, Dict
+
+_lock = threading.Lock()
+_providers: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+
+def register_metrics(name: str, provider: Callable[[], Dict[str, Any]]) -> None:
+    """Реєструє джерело лічильників, яке віддається через /admin/serving-metrics."""
+    with _lock:
+        _providers[name] = provider
+
+
+def collect_metrics() -> Dict[str, Any]:
+    with _lock:
+        providers = dict(_providers)
+
+    result: Dict[str, Any] = {}
+    for name, provider in providers.items():
+        try:
+            result[name] = provider()
+        except Exception as e:
+            result[name] = {"error": str(e)}
+    return result
@@ -0,0 +1,189 @@
+# backend/src/serving/near_duplicate.py
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.src.serving.metrics import register_metrics
+from backend.src.utils.phash import hamming
+
+
+class BKTree:
+    """
+    BK-дерево за відстанню Геммінга: пошук усіх хешів у радіусі r
+    відвідує лише гілки з |d(node, q) - d(node, child)| <= r.
+    """
+
+    def __init__(self):
+        self._root: Optional[list] = None  # [hash, [values], {distance: child}]
+        self.size = 0
+
+    def add(self, h: int, value: Any) -> None:
+        self.size += 1
+        if self._root is None:
+            self._root = [h, [value], {}]
+            return
+
+        node = self._root
+        while True:
+            d = hamming(h, node[0])
+            if d == 0:
+                node[1].append(value)
+                return
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = [h, [value], {}]
+                return
+            node = child
+
+    def search(self, h: int, radius: int) -> List[Tuple[int, Any]]:
+        if self._root is None:
+            return []
+
+        found: List[Tuple[int, Any]] = []
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            d = hamming(h, node[0])
+            if d <= radius:
+                found.extend((d, v) for v in node[1])
+            for dist, child in node[2].items():
+                if d - radius <= dist <= d + radius:
+                    stack.append(child)
+        found.sort(key=lambda x: x[0])
+        return found
+
+
+class NearDuplicateIndex:
+    """
+    Індекс перцептивних хешів уже проаналізованих зображень.
+    Значення — ключ ResultCache; хеші зберігаються в SQLite поруч
+    із кешем і завантажуються в BK-дерево при старті.
+
+    Розмір обмежений max_entries (витісняються найстаріші); ключі, яких
+    уже немає в кеші результатів, видаляються через remove. BK-дерево не
+    підтримує видалення, тож вилучені записи лише позначаються і
+    відфільтровуються при пошуку, а дерево перебудовується, коли їх стає
+    більше, ніж живих.
+    """
+
+    def __init__(self, name: str, version: str, radius: int, disk_path: Optional[str] = None,
+                 max_entries: int = 0):
+        self.name = name
+        self.version = version
+        self.radius = int(radius)
+        # 0 — без обмеження
+        self.max_entries = max(0, int(max_entries))
+
+        self._tree = BKTree()
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # ключ -> хеш, від найстаршого
+        self._lock = threading.Lock()
+        self._counters = {"lookups": 0, "matches": 0, "added": 0, "removed": 0, "rebuilds": 0}
+        self._lookup_ms_total = 0.0
+
+        self._db: Optional[sqlite3.Connection] = None
+        if disk_path:
+            self._open_disk(disk_path)
+
+        register_metrics(f"near_duplicate:{name}", self.stats)
+
+    def _open_disk(self, disk_path: str) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(disk_path)), exist_ok=True)
+        db = sqlite3.connect(disk_path, check_same_thread=False, isolation_level=None)
+        columns = {row[1] for row in db.execute("PRAGMA table_info(phashes)")}
+        if columns and "created_at" not in columns:
+            # Таблиця старого формату (без часу додавання) — індекс просто будується заново
+            db.execute("DROP TABLE phashes")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS phashes ("
+            " key TEXT PRIMARY KEY,"
+            " version TEXT NOT NULL,"
+            " phash TEXT NOT NULL,"
+            " created_at REAL NOT NULL)"
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS phashes_created_at ON phashes (created_at)")
+        db.execute("DELETE FROM phashes WHERE version != ?", (self.version,))
+        if self.max_entries:
+            db.execute(
+                "DELETE FROM phashes WHERE key NOT IN"
+                " (SELECT key FROM phashes ORDER BY created_at DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+        for key, h in db.execute("SELECT key, phash FROM phashes ORDER BY created_at"):
+            self._entries[key] = int(h, 16)
+            self._tree.add(int(h, 16), key)
+        self._db = db
+
+    def _db_write(self, sql: str, params: list) -> None:
+        if self._db is None:
+            return
+        try:
+            self._db.executemany(sql, params)
+        except sqlite3.Error as e:
+            print(f"Warning: near-duplicate index write failed ({e}).")
+
+    def _drop(self, keys: List[str]) -> List[str]:
+        """Вилучає ключі з живих записів (під _lock); повертає ті, що були в індексі."""
+        dropped = [key for key in keys if self._entries.pop(key, None) is not None]
+        self._counters["removed"] += len(dropped)
+        stale = self._tree.size - len(self._entries)
+        if stale > len(self._entries):
+            self._tree = BKTree()
+            for key, h in self._entries.items():
+                self._tree.add(h, key)
+            self._counters["rebuilds"] += 1
+        return dropped
+
+    def add(self, h: int, key: str) -> None:
+        with self._lock:
+            self._drop([key])
+            self._entries[key] = h
+            self._tree.add(h, key)
+            self._counters["added"] += 1
+
+            evicted = []
+            while self.max_entries and len(self._entries) > self.max_entries:
+                evicted.append(next(iter(self._entries)))
+                self._drop(evicted[-1:])
+
+            self._db_write(
+                "INSERT OR REPLACE INTO phashes (key, version, phash, created_at) VALUES (?, ?, ?, ?)",
+                [(key, self.version, f"{h:016x}", time.time())],
+            )
+            self._db_write("DELETE FROM phashes WHERE key = ?", [(k,) for k in evicted])
+
+    def remove(self, keys: List[str]) -> None:
+        """Вилучає ключі, результатів яких більше немає в кеші."""
+        with self._lock:
+            dropped = self._drop(list(keys))
+            self._db_write("DELETE FROM phashes WHERE key = ?", [(k,) for k in dropped])
+
+    def lookup(self, h: int) -> List[Tuple[int, str]]:
+        """Усі (відстань, ключ) у радіусі, від найближчого."""
+        started = time.perf_counter()
+        with self._lock:
+            # вузол дерева з ключем, уже вилученим чи доданим знову з іншим хешем, не рахується
+            found = [
+                (d, key) for d, key in self._tree.search(h, self.radius)
+                if key in self._entries and hamming(h, self._entries[key]) == d
+            ]
+            self._counters["lookups"] += 1
+            if found:
+                self._counters["matches"] += 1
+            self._lookup_ms_total += (time.perf_counter() - started) * 1000.0
+        return found
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._counters["lookups"]
+            return {
+                "radius": self.radius,
+                "indexed": len(self._entries),
+                "max_entries": self.max_entries,
+                "tree_nodes": self._tree.size,
+                **self._counters,
+                "avg_lookup_ms": (self._lookup_ms_total / lookups) if lookups else None,
+            }
@@ -0,0 +1,70 @@
+# backend/src/serving/onnx_runtime.py
+#
+# Інференс ViT і MVSSNet через ONNX Runtime на CPU (моделі експортує
+# backend/training/export_onnx.py). onnxruntime — необов'язкова залежність:
+# без нього або без файлу моделі сервіс лишається на torch.
+
+from pathlib import Path
+from typing import List, Optional
+
+import torch
+
+from backend.src.serving import config as serving_config
+
+try:
+    import onnxruntime as ort
+except ImportError:
+    ort = None
+
+VIT_ONNX_FILE = "ai_vit_b16.onnx"
+MVSS_ONNX_FILE = "mvss_inference.onnx"
+
+
+class OnnxModel:
+    """
+    Сесія ORT з інтерфейсом forward torch-моделі: тензор [B, ...] -> тензор (CPU).
+    Лише інференс: Grad-CAM і тренування лишаються на torch.
+    InferenceSession.run потокобезпечний, тож один екземпляр спільний для всіх потоків.
+    """
+
+    device = torch.device("cpu")
+
+    def __init__(self, path: str | Path, intra_op_threads: int = 0, inter_op_threads: int = 0):
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        # 0 — значення ORT за замовчуванням
+        options.intra_op_num_threads = max(0, intra_op_threads)
+        options.inter_op_num_threads = max(0, inter_op_threads)
+        self.path = Path(path)
+        self.session = ort.InferenceSession(str(path), options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, x: torch.Tensor) -> torch.Tensor:
+        inputs = {self.input_name: x.detach().to("cpu", torch.float32).contiguous().numpy()}
+        return torch.from_numpy(self.session.run(None, inputs)[0])
+
+    def eval(self) -> "OnnxModel":
+        return self
+
+
+def load_onnx_model(filename: str) -> Optional[OnnxModel]:
+    """Модель з ONNX_MODELS_DIR або None (тоді викликач лишається на torch)."""
+    path = Path(serving_config.ONNX_MODELS_DIR) / filename
+    if ort is None:
+        print("Warning: onnxruntime is not installed. Falling back to torch.")
+        return None
+    if not path.is_file():
+        print(f"Warning: {path} not found. Falling back to torch.")
+        return None
+    print(f"Loading ONNX model from: {path}")
+    return OnnxModel(path, serving_config.ORT_INTRA_OP_THREADS, serving_config.ORT_INTER_OP_THREADS)
+
+
+def backend_name(model) -> str:
+    return "onnx" if isinstance(model, OnnxModel) else "torch"
+
+
+def onnx_files(*models) -> List[Path]:
+    """Файли .onnx моделей, що працюють через ORT (для версії кешу результатів)."""
+    return [model.path for model in models if isinstance(model, OnnxModel)]
@@ -0,0 +1,98 @@
+# backend/src/serving/pipeline.py
+
+import time
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, wait
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence, Tuple
+
+
+class StageGraph:
+    """
+    Невеликий DAG етапів аналізу.
+
+    Кожен етап оголошується як fn(*значення_залежностей) і обчислюється
+    рівно один раз за запуск. Незалежні етапи виконуються паралельно
+    на переданому пулі потоків (torch та cv2 відпускають GIL).
+    """
+
+    def __init__(self):
+        self._stages: Dict[str, Tuple[Callable[..., Any], Tuple[str, ...]]] = {}
+
+    def add(self, name: str, fn: Callable[..., Any], deps: Sequence[str] = ()) -> "StageGraph":
+        if name in self._stages:
+            raise ValueError(f"StageGraph: етап '{name}' уже оголошено.")
+        self._stages[name] = (fn, tuple(deps))
+        return self
+
+    def _required(self, targets: Iterable[str], inputs: Dict[str, Any]) -> set:
+        required: set = set()
+        stack = list(targets)
+        while stack:
+            name = stack.pop()
+            if name in required or name in inputs:
+                continue
+            if name not in self._stages:
+                raise KeyError(f"StageGraph: невідомий етап або вхід '{name}'.")
+            required.add(name)
+            stack.extend(self._stages[name][1])
+        return required
+
+    def closure(self, targets: Iterable[str]) -> set:
+        """Етапи, потрібні для targets (разом із ними), без зовнішніх входів."""
+        required: set = set()
+        stack = [name for name in targets if name in self._stages]
+        while stack:
+            name = stack.pop()
+            if name in required:
+                continue
+            required.add(name)
+            stack.extend(dep for dep in self._stages[name][1] if dep in self._stages)
+        return required
+
+    def run(
+            self,
+            executor: Executor,
+            inputs: Dict[str, Any],
+            targets: Optional[Sequence[str]] = None,
+            timings: Optional[Dict[str, float]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Обчислює targets (за замовчуванням усі етапи) та їхні залежності.
+        Повертає словник зі входами та результатами всіх виконаних етапів.
+        Якщо передано timings, туди записується час кожного етапу в мс.
+        """
+        values: Dict[str, Any] = dict(inputs)
+        pending = self._required(targets if targets is not None else list(self._stages), inputs)
+        running: Dict[Future, str] = {}
+
+        def timed(name: str, fn: Callable[..., Any], args: list) -> Any:
+            started = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                if timings is not None:
+                    timings[name] = (time.perf_counter() - started) * 1000.0
+
+        try:
+            while pending or running:
+                ready = [
+                    name for name in pending
+                    if all(dep in values for dep in self._stages[name][1])
+                ]
+                for name in ready:
+                    pending.discard(name)
+                    fn, deps = self._stages[name]
+                    args = [values[dep] for dep in deps]
+                    running[executor.submit(timed, name, fn, args)] = name
+
+                if not running:
+                    raise RuntimeError(f"StageGraph: циклічні залежності між етапами {sorted(pending)}.")
+
+                done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                for fut in done:
+                    values[running.pop(fut)] = fut.result()
+        except BaseException:
+            for fut in running:
+                fut.cancel()
+            raise
+
+        return values
@@ -0,0 +1,308 @@
+# backend/src/serving/result_cache.py
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from backend.src.serving.metrics import register_metrics
+
+# Джерело результату для get_or_compute
+SOURCE_MEMORY = "memory"
+SOURCE_DISK = "disk"
+SOURCE_SHARED = "shared"
+SOURCE_COMPUTED = "computed"
+
+# Скільки найстаріших записів диска перевіряється за один запит витіснення
+DISK_EVICT_BATCH = 64
+
+
+def sha256_hex(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def fingerprint_version(files: Iterable[Path], extra: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Версія результатів аналізу: змінюється, коли змінюються чекпойнти
+    (шлях, розмір, mtime) або передані параметри (напр. константи fusion).
+    """
+    h = hashlib.sha256()
+    for path in files:
+        path = Path(path)
+        try:
+            st = path.stat()
+            h.update(f"{path.name}:{st.st_size}:{st.st_mtime_ns};".encode())
+        except OSError:
+            h.update(f"{path.name}:missing;".encode())
+    if extra:
+        h.update(json.dumps(extra, sort_keys=True, default=str).encode())
+    return h.hexdigest()[:16]
+
+
+def json_encode(value: Any) -> bytes:
+    return json.dumps(value).encode("utf-8")
+
+
+def json_decode(data: bytes) -> Any:
+    return json.loads(data.decode("utf-8"))
+
+
+class ResultCache:
+    """
+    Content-addressed кеш результатів аналізу.
+
+    Ключ — хеш вмісту файлу; до нього додається версія моделей/fusion,
+    тож після зміни чекпойнтів старі записи просто перестають збігатися
+    (а з дискового рівня видаляються при старті).
+    Рівні: LRU у пам'яті (обмежений у байтах) -> SQLite на диску
+    (обмежений у байтах disk_bytes, витісняються найстаріші за created_at).
+    Одночасні запити з однаковим ключем чекають одне обчислення.
+    """
+
+    def __init__(
+            self,
+            name: str,
+            version: str,
+            memory_bytes: int,
+            disk_path: Optional[str] = None,
+            disk_bytes: int = 0,
+            encode: Callable[[Any], bytes] = json_encode,
+            decode: Callable[[bytes], Any] = json_decode,
+    ):
+        self.name = name
+        self.version = version
+        self.memory_bytes = max(0, int(memory_bytes))
+        # 0 — дисковий рівень без обмеження
+        self.disk_bytes = max(0, int(disk_bytes))
+        self.encode = encode
+        self.decode = decode
+
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_used = 0
+        self._inflight: Dict[str, Future] = {}
+        self._evict_listeners: List[Callable[[List[str]], None]] = []
+
+        self._counters = {
+            "hits_memory": 0,
+            "hits_disk": 0,
+            "hits_shared": 0,
+            "misses": 0,
+            "evictions": 0,
+            "disk_evictions": 0,
+            "errors": 0,
+        }
+
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._disk_used = 0
+        if disk_path:
+            self._open_disk(disk_path)
+
+        register_metrics(f"cache:{name}", self.stats)
+
+    # ---------- ключі ----------
+    def key(self, content_hash: str, variant: str = "") -> str:
+        return f"{self.version}:{variant}:{content_hash}"
+
+    # ---------- диск ----------
+    def _open_disk(self, disk_path: str) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(disk_path)), exist_ok=True)
+        db = sqlite3.connect(disk_path, check_same_thread=False, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " key TEXT PRIMARY KEY,"
+            " version TEXT NOT NULL,"
+            " value BLOB NOT NULL,"
+            " created_at REAL NOT NULL)"
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS results_created_at ON results (created_at)")
+        # Інвалідація: записи інших версій моделей більше не потрібні
+        db.execute("DELETE FROM results WHERE version != ?", (self.version,))
+        self._disk_used = db.execute("SELECT COALESCE(SUM(LENGTH(value)), 0) FROM results").fetchone()[0]
+        self._db = db
+        with self._db_lock:
+            self._disk_evict()
+
+    def _disk_get(self, key: str) -> Optional[bytes]:
+        if self._db is None:
+            return None
+        with self._db_lock:
+            row = self._db.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+        return bytes(row[0]) if row else None
+
+    def _disk_put(self, key: str, data: bytes) -> List[str]:
+        if self._db is None:
+            return []
+        with self._db_lock:
+            old = self._db.execute("SELECT LENGTH(value) FROM results WHERE key = ?", (key,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO results (key, version, value, created_at) VALUES (?, ?, ?, ?)",
+                (key, self.version, sqlite3.Binary(data), time.time()),
+            )
+            self._disk_used += len(data) - (old[0] if old else 0)
+            return self._disk_evict()
+
+    def _disk_evict(self) -> List[str]:
+        """
+        Видаляє найстаріші записи, доки диск не вкладеться в disk_bytes (під _db_lock).
+        Повертає ключі видалених записів.
+        """
+        removed: List[str] = []
+        while self.disk_bytes and self._disk_used > self.disk_bytes:
+            rows = self._db.execute(
+                "SELECT key, LENGTH(value) FROM results ORDER BY created_at LIMIT ?", (DISK_EVICT_BATCH,)
+            ).fetchall()
+            if not rows:
+                self._disk_used = 0
+                break
+            evicted = []
+            for key, size in rows:
+                evicted.append(key)
+                self._disk_used -= size
+                if self._disk_used <= self.disk_bytes:
+                    break
+            self._db.executemany("DELETE FROM results WHERE key = ?", [(key,) for key in evicted])
+            with self._lock:
+                self._counters["disk_evictions"] += len(evicted)
+            removed.extend(evicted)
+        return removed
+
+    # ---------- пам'ять ----------
+    def _memory_get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+            return data
+
+    def _memory_put(self, key: str, data: bytes) -> List[str]:
+        """Повертає ключі, витіснені з пам'яті."""
+        evicted_keys: List[str] = []
+        if len(data) > self.memory_bytes:
+            return evicted_keys
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_used -= len(old)
+            self._memory[key] = data
+            self._memory_used += len(data)
+            while self._memory_used > self.memory_bytes and self._memory:
+                evicted_key, evicted = self._memory.popitem(last=False)
+                self._memory_used -= len(evicted)
+                self._counters["evictions"] += 1
+                evicted_keys.append(evicted_key)
+        return evicted_keys
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            self._counters[counter] += 1
+
+    def add_evict_listener(self, listener: Callable[[List[str]], None]) -> None:
+        """
+        listener(ключі) викликається, коли записи остаточно зникають з кешу:
+        витіснення з диска, а без дискового рівня — з пам'яті.
+        """
+        self._evict_listeners.append(listener)
+
+    def _notify_evicted(self, keys: List[str]) -> None:
+        if not keys:
+            return
+        for listener in self._evict_listeners:
+            try:
+                listener(keys)
+            except Exception as e:
+                print(f"Warning: result cache evict listener failed ({e}).")
+
+    # ---------- публічне API ----------
+    def get(self, key: str) -> Tuple[Optional[Any], Optional[str]]:
+        data = self._memory_get(key)
+        if data is not None:
+            return self.decode(data), SOURCE_MEMORY
+
+        try:
+            data = self._disk_get(key)
+        except sqlite3.Error as e:
+            self._count("errors")
+            print(f"Warning: result cache disk read failed ({e}).")
+            data = None
+        if data is not None:
+            self._memory_put(key, data)
+            return self.decode(data), SOURCE_DISK
+
+        return None, None
+
+    def put(self, key: str, value: Any) -> None:
+        data = self.encode(value)
+        evicted = self._memory_put(key, data)
+        if self._db is not None:
+            # із пам'яті витіснено, але на диску записи лишаються
+            evicted = []
+        try:
+            evicted += self._disk_put(key, data)
+        except sqlite3.Error as e:
+            self._count("errors")
+            print(f"Warning: result cache disk write failed ({e}).")
+        self._notify_evicted(evicted)
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any],
+                       fallback_keys: Iterable[str] = ()) -> Tuple[Any, str]:
+        """
+        Повертає (значення, джерело). Якщо такий самий ключ уже
+        обчислюється в іншому потоці — чекає на його результат.
+        fallback_keys — інші ключі, значення яких теж підходять (перевіряються першими).
+        """
+        for lookup_key in (*fallback_keys, key):
+            value, source = self.get(lookup_key)
+            if source is not None:
+                self._count("hits_" + source)
+                return value, source
+
+        with self._lock:
+            fut = self._inflight.get(key)
+            owner = fut is None
+            if owner:
+                fut = Future()
+                self._inflight[key] = fut
+
+        if not owner:
+            self._count("hits_shared")
+            return fut.result(), SOURCE_SHARED
+
+        self._count("misses")
+        try:
+            value = compute()
+            self.put(key, value)
+            fut.set_result(value)
+            return value, SOURCE_COMPUTED
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            c = dict(self._counters)
+            hits = c["hits_memory"] + c["hits_disk"] + c["hits_shared"]
+            lookups = hits + c["misses"]
+            return {
+                "version": self.version,
+                **c,
+                "hit_rate": (hits / lookups) if lookups else None,
+                "memory_items": len(self._memory),
+                "memory_bytes": self._memory_used,
+                "memory_limit_bytes": self.memory_bytes,
+                "inflight": len(self._inflight),
+                "disk_enabled": self._db is not None,
+                "disk_bytes": self._disk_used,
+                "disk_limit_bytes": self.disk_bytes,
+            }
@@ -0,0 +1,84 @@
+# backend/src/utils/batch_input.py
+#
+# Розгортання завантаження /analyze_batch (кілька файлів та/або ZIP-архіви)
+# у плаский список зображень. Вміст не читається в пам'ять цілком:
+# звичайні файли передаються як є (UploadFile уже спулиться на диск),
+# члени архіву копіюються у SpooledTemporaryFile.
+
+import mimetypes
+import posixpath
+import zipfile
+from typing import BinaryIO, Iterable, Optional
+
+from backend.src.utils.image_decode import spool
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".bmp", ".tif", ".tiff"}
+
+
+class BatchInputError(ValueError):
+    """Завантаження не відповідає обмеженням пакетного аналізу."""
+
+
+def _is_zip(filename: Optional[str], content_type: Optional[str], fileobj: BinaryIO) -> bool:
+    if (filename or "").lower().endswith(".zip") or content_type in ("application/zip", "application/x-zip-compressed"):
+        return True
+    pos = fileobj.tell()
+    try:
+        return zipfile.is_zipfile(fileobj)
+    finally:
+        fileobj.seek(pos)
+
+
+def _zip_members(archive: zipfile.ZipFile) -> Iterable[zipfile.ZipInfo]:
+    for info in archive.infolist():
+        name = info.filename
+        base = posixpath.basename(name)
+        if info.is_dir() or not base or base.startswith(".") or name.startswith("__MACOSX/"):
+            continue
+        if posixpath.splitext(base)[1].lower() not in IMAGE_EXTENSIONS:
+            continue
+        yield info
+
+
+def expand_uploads(uploads: Iterable[tuple[Optional[str], Optional[str], BinaryIO]],
+                   max_files: int, max_total_bytes: int,
+                   spool_bytes: int) -> list[tuple[str, Optional[str], BinaryIO]]:
+    """
+    uploads — (ім'я файлу, content-type, файловий об'єкт).
+    Повертає [(ім'я, mime, файл)]; ZIP-архіви розгортаються (лише файли
+    зображень). Обмеження рахуються за розпакованим розміром, тож
+    "zip-бомба" відсікається ще до читання вмісту.
+    """
+    items: list[tuple[str, Optional[str], BinaryIO]] = []
+    total = 0
+
+    def _take(size: int) -> None:
+        nonlocal total
+        if len(items) >= max_files:
+            raise BatchInputError(f"Забагато файлів у пакеті (максимум {max_files}).")
+        total += size
+        if total > max_total_bytes:
+            raise BatchInputError(f"Пакет завеликий (максимум {max_total_bytes // (1024 * 1024)} МБ).")
+
+    for filename, content_type, fileobj in uploads:
+        if not _is_zip(filename, content_type, fileobj):
+            fileobj.seek(0, 2)
+            _take(fileobj.tell())
+            fileobj.seek(0)
+            items.append((filename or "unnamed", content_type, fileobj))
+            continue
+
+        try:
+            archive = zipfile.ZipFile(fileobj)
+        except zipfile.BadZipFile:
+            raise BatchInputError(f"Пошкоджений ZIP-архів: {filename}") from None
+        with archive:
+            for info in _zip_members(archive):
+                _take(info.file_size)
+                mime, _ = mimetypes.guess_type(info.filename)
+                with archive.open(info) as member:
+                    items.append((info.filename, mime, spool(member, spool_bytes)))
+
+    if not items:
+        raise BatchInputError("У пакеті немає зображень.")
+    return items
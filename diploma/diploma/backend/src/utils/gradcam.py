@@ -1,45 +1,115 @@
 # # backend/src/utils/gradcam.py
+#
+# Grad-CAM для ViT. Стан одного виклику (активації, градієнт) живе лише
+# в контексті цього виклику, а не на об'єкті; параметри моделі не
+# отримують .grad і zero_grad не потрібен. Тому один екземпляр можна
+# викликати з багатьох потоків одночасно, з батчем B>1 і своїм класом
+# для кожного зразка.
+
+import threading
 
 import torch
 
 import torch.nn.functional as F
 
 
+def _block_index(model, target_layer):
+    """Індекс блоку ViT, чий norm1 — цільовий шар CAM (None, якщо це інший шар)."""
+    for i, block in enumerate(getattr(model, "blocks", ())):
+        if getattr(block, "norm1", None) is target_layer:
+            return i
+    return None
+
+
 class ViTGradCAM:
     def __init__(self, model, target_layer, num_patches_side: int = 14):
         self.model = model.eval()
         self.target_layer = target_layer
         self.num_patches_side = num_patches_side
 
-        self.activations = None  # [B, N, C]
-        self.gradients = None  # [B, N, C]
-
-        self._h_fwd = target_layer.register_forward_hook(self._hook_acts)
-        self._h_bwd = target_layer.register_full_backward_hook(self._hook_grads)
+        # Шар CAM — norm1 блоку timm ViT: частковий forward (див. _partial_forward),
+        # хуки не потрібні. Для іншого шару — forward-хук, що підміняє вихід шару
+        # листовим тензором у контексті поточного виклику (потоку).
+        self._block_idx = _block_index(model, target_layer)
+        self._local = threading.local()
+        self._h_fwd = None
+        if self._block_idx is None:
+            self._h_fwd = target_layer.register_forward_hook(self._hook_acts)
 
     def _hook_acts(self, module, inputs, output):
-        self.activations = output.detach()
-
-    def _hook_grads(self, module, grad_input, grad_output):
-        self.gradients = grad_output[0].detach()
-
-    def __call__(self, x, class_idx=None):
-        self.model.zero_grad(set_to_none=True)
+        ctx = getattr(self._local, "ctx", None)
+        # Виклик не з __call__ (звичайний forward) — шар працює як завжди
+        if ctx is None or not torch.is_grad_enabled():
+            return None
+        # Далі граф будується від цього тензора; до попередніх шарів градієнт не йде
+        acts = output.detach().requires_grad_(True)
+        ctx["activations"] = acts
+        return acts
+
+    def _partial_forward(self, x):
+        """
+        Блоки до цільового — під no_grad (без збережених активацій);
+        граф будується лише від виходу norm1 цільового блоку до логітів.
+        Повертає (логіти, активації norm1 з requires_grad).
+        """
+        model = self.model
+        k = self._block_idx
+        with torch.no_grad():
+            h = model.norm_pre(model.patch_drop(model._pos_embed(model.patch_embed(x))))
+            for block in model.blocks[:k]:
+                h = block(h)
+            block = model.blocks[k]
+            acts = block.norm1(h)
+
+        acts.requires_grad_(True)
+        with torch.enable_grad():
+            h = h + block.drop_path1(block.ls1(block.attn(acts)))
+            h = h + block.drop_path2(block.ls2(block.mlp(block.norm2(h))))
+            for later in model.blocks[k + 1:]:
+                h = later(h)
+            logits = model.forward_head(model.norm(h))
+        return logits, acts
+
+    def _hooked_forward(self, x):
+        ctx = {}
+        self._local.ctx = ctx
+        try:
+            with torch.enable_grad():
+                logits = self.model(x)
+        finally:
+            self._local.ctx = None
+        acts = ctx.get("activations")
+        if acts is None:
+            raise RuntimeError("ViTGradCAM: hooks did not capture activations/gradients.")
+        return logits, acts
 
-        logits = self.model(x)  # [B, num_classes]
+    @staticmethod
+    def _class_indices(logits, class_idx) -> torch.Tensor:
+        """None -> argmax; int -> той самий клас для всіх; послідовність / тензор [B] -> свій для кожного."""
         if class_idx is None:
-            class_idx = logits.argmax(dim=1)
+            return logits.argmax(dim=1)
+        if isinstance(class_idx, int):
+            return torch.full((logits.size(0),), class_idx, dtype=torch.long, device=logits.device)
+        class_idx = torch.as_tensor(class_idx, dtype=torch.long, device=logits.device).reshape(-1)
+        if class_idx.numel() != logits.size(0):
+            raise ValueError(
+                f"ViTGradCAM: {class_idx.numel()} індексів класів для батчу з {logits.size(0)} зображень."
+            )
+        return class_idx
 
-        scores = logits[torch.arange(logits.size(0)), class_idx]
-        scores.sum().backward()
+    def __call__(self, x, class_idx=None):
+        if self._block_idx is not None:
+            logits, acts = self._partial_forward(x)
+        else:
+            logits, acts = self._hooked_forward(x)  # logits [B, num_classes]
 
-        acts = self.activations  # [B, N, C]
-        grads = self.gradients  # [B, N, C]
+        class_idx = self._class_indices(logits, class_idx)
+        scores = logits[torch.arange(logits.size(0), device=logits.device), class_idx]
 
-        if acts is None or grads is None:
-            raise RuntimeError("ViTGradCAM: hooks did not capture activations/gradients.")
+        # Зразки батчу незалежні, тож градієнт суми дає градієнт кожного за своїми активаціями
+        grads = torch.autograd.grad(scores.sum(), acts)[0]  # [B, N, C]
+        logits = logits.detach()
 
-        acts = acts[:, 1:, :]  # [B, N-1, C]
         grads = grads[:, 1:, :]  # [B, N-1, C]
 
         B, N, C = grads.shape
@@ -61,5 +131,5 @@ class ViTGradCAM:
         return cam, logits
 
     def close(self):
-        self._h_fwd.remove()
-        self._h_bwd.remove()
+        if self._h_fwd is not None:
+            self._h_fwd.remove()
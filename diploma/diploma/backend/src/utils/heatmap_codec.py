@@ -0,0 +1,147 @@
+# backend/src/utils/heatmap_codec.py
+
+import base64
+import io
+import json
+from typing import Any, Dict, Optional
+
+import cv2
+import numpy as np
+
+# Формати heatmap у відповіді /analyze_full:
+#   json — вкладені списки float (як раніше, сумісно з фронтендом)
+#   png  — 8-бітний grayscale PNG у base64 (значення 0..1 -> 0..255)
+#   f16  — сирі байти float16 (little-endian, C-порядок) у base64
+HEATMAP_FORMATS = ("json", "png", "f16")
+
+# Поле відповіді -> назва карти в result["heatmaps"].
+# patch / fusion heatmap — та сама карта MVSS, тому вона передається один раз.
+HEATMAP_FIELDS = {
+    "ai_heatmap": "ai",
+    "manip_heatmap": "manip",
+    "patch_heatmap": "manip",
+    "fusion_heatmap": "manip",
+}
+
+
+def downsample(m: np.ndarray, size: Optional[int]) -> np.ndarray:
+    """Area-даунсемплінг до size x size; менші карти не збільшуються."""
+    m = np.asarray(m, dtype=np.float32)
+    if not size or (m.shape[0] <= size and m.shape[1] <= size):
+        return m
+    h = min(size, m.shape[0])
+    w = min(size, m.shape[1])
+    return cv2.resize(m, (w, h), interpolation=cv2.INTER_AREA)
+
+
+def encode_heatmap(m: np.ndarray, fmt: str, size: Optional[int] = None) -> Any:
+    m = downsample(m, size)
+
+    if fmt == "json":
+        return m.tolist()
+
+    if fmt == "png":
+        q = np.rint(np.clip(m, 0.0, 1.0) * 255.0).astype(np.uint8)
+        ok, buf = cv2.imencode(".png", q)
+        if not ok:
+            raise RuntimeError("Не вдалося закодувати heatmap у PNG.")
+        return {
+            "encoding": "png",
+            "shape": list(q.shape),
+            "scale": 1.0 / 255.0,
+            "data": base64.b64encode(buf.tobytes()).decode("ascii"),
+        }
+
+    if fmt == "f16":
+        raw = np.ascontiguousarray(m, dtype="<f2").tobytes()
+        return {
+            "encoding": "f16",
+            "dtype": "float16",
+            "shape": list(m.shape),
+            "data": base64.b64encode(raw).decode("ascii"),
+        }
+
+    raise ValueError(f"Невідомий формат heatmap: {fmt}")
+
+
+def decode_heatmap(obj: Any) -> np.ndarray:
+    """Обернене до encode_heatmap: список / png / f16 -> float32-масив."""
+    if isinstance(obj, list):
+        return np.asarray(obj, dtype=np.float32)
+
+    encoding = obj.get("encoding")
+    raw = base64.b64decode(obj["data"])
+    if encoding == "png":
+        q = cv2.imdecode(np.frombuffer(raw, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+        return q.astype(np.float32) * float(obj.get("scale", 1.0 / 255.0))
+    if encoding == "f16":
+        return np.frombuffer(raw, dtype="<f2").reshape(obj["shape"]).astype(np.float32)
+
+    raise ValueError(f"Невідоме кодування heatmap: {encoding}")
+
+
+def extract_heatmaps(response: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """Дістає heatmap із відповіді будь-якого формату (для міграції історії)."""
+    encoded = response.get("heatmaps") or {}
+    heatmaps: Dict[str, np.ndarray] = {}
+    for field, name in HEATMAP_FIELDS.items():
+        value = response.get(field)
+        if name in heatmaps or value is None:
+            continue
+        if isinstance(value, dict) and "ref" in value:
+            value = encoded.get(value["ref"])
+            if value is None:
+                continue
+        heatmaps[name] = decode_heatmap(value)
+    return heatmaps
+
+
+def strip_heatmaps(response: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in response.items() if k not in HEATMAP_FIELDS and k != "heatmaps"}
+
+
+def render_response(result: Dict[str, Any], fmt: str = "json", size: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Формує відповідь API з внутрішнього результату аналізу
+    (оцінки + result["heatmaps"] як numpy-масиви).
+    """
+    response = {k: v for k, v in result.items() if k != "heatmaps"}
+    heatmaps = result.get("heatmaps") or {}
+
+    if fmt == "json":
+        encoded = {name: encode_heatmap(m, "json", size) for name, m in heatmaps.items()}
+        for field, name in HEATMAP_FIELDS.items():
+            if name in encoded:
+                response[field] = encoded[name]
+        return response
+
+    response["heatmaps"] = {name: encode_heatmap(m, fmt, size) for name, m in heatmaps.items()}
+    for field, name in HEATMAP_FIELDS.items():
+        if name in heatmaps:
+            response[field] = {"ref": name}
+    return response
+
+
+# ---------- серіалізація внутрішнього результату (для кешу) ----------
+
+def pack_result(result: Dict[str, Any]) -> bytes:
+    meta = {k: v for k, v in result.items() if k != "heatmaps"}
+    arrays = {
+        f"heatmap_{name}": np.asarray(m, dtype=np.float32)
+        for name, m in (result.get("heatmaps") or {}).items()
+    }
+    buf = io.BytesIO()
+    np.savez(buf, meta=np.frombuffer(json.dumps(meta).encode("utf-8"), dtype=np.uint8), **arrays)
+    return buf.getvalue()
+
+
+def unpack_result(data: bytes) -> Dict[str, Any]:
+    with np.load(io.BytesIO(data), allow_pickle=False) as npz:
+        result = json.loads(npz["meta"].tobytes().decode("utf-8"))
+        heatmaps = {
+            key[len("heatmap_"):]: npz[key]
+            for key in npz.files if key.startswith("heatmap_")
+        }
+    if heatmaps:
+        result["heatmaps"] = heatmaps
+    return result
@@ -0,0 +1,93 @@
+# backend/src/utils/heatmap_store.py
+
+import hashlib
+import io
+import os
+import tempfile
+import zlib
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict
+
+import numpy as np
+
+from backend.src.serving import config as serving_config
+
+try:
+    import zstandard
+except ImportError:  # zstd необов'язковий — без нього використовується zlib
+    zstandard = None
+
+_CODEC_ZSTD = b"Z"
+_CODEC_ZLIB = b"L"
+
+
+def _compress(payload: bytes) -> bytes:
+    if zstandard is not None:
+        return _CODEC_ZSTD + zstandard.ZstdCompressor(level=10).compress(payload)
+    return _CODEC_ZLIB + zlib.compress(payload, 6)
+
+
+def _decompress(blob: bytes) -> bytes:
+    codec, body = blob[:1], blob[1:]
+    if codec == _CODEC_ZSTD:
+        if zstandard is None:
+            raise RuntimeError("Heatmap стиснуто zstd, але пакет zstandard не встановлено.")
+        return zstandard.ZstdDecompressor().decompress(body)
+    if codec == _CODEC_ZLIB:
+        return zlib.decompress(body)
+    raise ValueError("Невідомий формат файлу heatmap.")
+
+
+class HeatmapStore:
+    """
+    Content-addressed сховище heatmap на локальному диску.
+
+    Карти зберігаються як float16 (npz), стиснуті zstd (або zlib), у файлі
+    <root>/<ключ[:2]>/<ключ>.hm, де ключ — sha256 нестиснутого вмісту.
+    Однакові карти (повторні завантаження) зберігаються один раз.
+    """
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+
+    def _path(self, key: str) -> Path:
+        if len(key) != 64 or any(c not in "0123456789abcdef" for c in key):
+            raise ValueError(f"Некоректний ключ heatmap: {key!r}")
+        return self.root / key[:2] / f"{key}.hm"
+
+    def put(self, heatmaps: Dict[str, np.ndarray]) -> str:
+        buf = io.BytesIO()
+        np.savez(buf, **{name: np.asarray(m, dtype=np.float16) for name, m in sorted(heatmaps.items())})
+        payload = buf.getvalue()
+        key = hashlib.sha256(payload).hexdigest()
+
+        path = self._path(key)
+        if path.exists():
+            return key
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(_compress(payload))
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        return key
+
+    def get(self, key: str) -> Dict[str, np.ndarray]:
+        path = self._path(key)
+        payload = _decompress(path.read_bytes())
+        with np.load(io.BytesIO(payload), allow_pickle=False) as npz:
+            return {name: npz[name].astype(np.float32) for name in npz.files}
+
+    def exists(self, key: str) -> bool:
+        return self._path(key).exists()
+
+
+@lru_cache(maxsize=1)
+def get_heatmap_store() -> HeatmapStore:
+    return HeatmapStore(serving_config.HEATMAP_STORE_DIR)
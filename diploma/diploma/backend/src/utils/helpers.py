@@ -1,18 +1,19 @@
 import torch
 from PIL import Image
-from torchvision import transforms
+
+from backend.src.utils.preprocess import ImagePyramid
 
 DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
 
+
 # === Перетворення зображення в тензор ===
-IMAGENET_MEAN = [0.485, 0.456, 0.406]
-IMAGENET_STD = [0.229, 0.224, 0.225]
+def to_tensor(img: Image.Image | ImagePyramid, size: int = 224) -> torch.Tensor:
+    """Нормалізований тензор 1x3xSxS на DEVICE (через спільну піраміду препроцесингу)."""
+    pyramid = img if isinstance(img, ImagePyramid) else ImagePyramid(img)
+    return pyramid.tensor(size).to(DEVICE)
 
 
-def to_tensor(img: Image.Image, size: int = 224) -> torch.Tensor:
-    tr = transforms.Compose([
-        transforms.Resize((size, size)),
-        transforms.ToTensor(),
-        transforms.Normalize(mean=IMAGENET_MEAN, std=IMAGENET_STD),
-    ])
-    return tr(img).unsqueeze(0).to(DEVICE)
+def model_device(model) -> torch.device:
+    """Пристрій моделі: torch-модуль — за параметрами, обгортка ORT — атрибут device."""
+    device = getattr(model, "device", None)
+    return device if isinstance(device, torch.device) else next(model.parameters()).device
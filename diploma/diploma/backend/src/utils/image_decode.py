@@ -0,0 +1,107 @@
+# backend/src/utils/image_decode.py
+#
+# Декодування завантажених зображень.
+# Спершу читається лише заголовок (формат, розміри); JPEG декодується
+# зі зменшенням у DCT (PIL draft / libjpeg scale 1/2, 1/4, 1/8) до
+# найменшого масштабу, за якого обидві сторони ще >= потрібного розміру.
+# Детектори працюють на 224 і 512, тайловий MVSS — на зображенні з
+# обмеженою довшою стороною, тож повне декодування 24–50 Мп кадру
+# не потрібне.
+
+import hashlib
+import io
+import math
+import shutil
+import tempfile
+from typing import BinaryIO, Optional, Union
+
+from PIL import Image, UnidentifiedImageError
+
+# bytes (завдання з БД) або файловий об'єкт (UploadFile.file, тимчасовий файл)
+ImageContent = Union[bytes, bytearray, memoryview, BinaryIO]
+
+HASH_CHUNK_BYTES = 1024 * 1024
+
+
+class ImageTooLargeError(ValueError):
+    """Зображення перевищує бюджет пікселів для декодування."""
+
+
+class ImageDecodeError(ValueError):
+    """Вміст не є зображенням підтримуваного формату або пошкоджений."""
+
+
+def _as_file(content: ImageContent) -> BinaryIO:
+    if isinstance(content, (bytes, bytearray, memoryview)):
+        return io.BytesIO(content)
+    content.seek(0)
+    return content
+
+
+def content_digest(content: ImageContent) -> tuple[int, str]:
+    """(розмір, sha256) — файл хешується частинами, без читання в пам'ять."""
+    if isinstance(content, (bytes, bytearray, memoryview)):
+        return len(content), hashlib.sha256(content).hexdigest()
+
+    h = hashlib.sha256()
+    size = 0
+    content.seek(0)
+    for chunk in iter(lambda: content.read(HASH_CHUNK_BYTES), b""):
+        h.update(chunk)
+        size += len(chunk)
+    content.seek(0)
+    return size, h.hexdigest()
+
+
+def spool(fileobj: BinaryIO, max_memory_bytes: int) -> BinaryIO:
+    """Копія потоку: у пам'яті до max_memory_bytes, далі — у тимчасовому файлі."""
+    out = tempfile.SpooledTemporaryFile(max_size=max_memory_bytes)
+    shutil.copyfileobj(fileobj, out, HASH_CHUNK_BYTES)
+    out.seek(0)
+    return out
+
+
+def draft_size(size: tuple[int, int], min_size: int, max_side: Optional[int] = None) -> tuple[int, int]:
+    """
+    Найменший розмір (w, h), нижче якого draft не має зменшувати: обидві
+    сторони >= min_size, а якщо споживач зменшує довшу сторону до max_side —
+    ще й довша сторона >= max_side (зі збереженням пропорцій).
+    """
+    if not max_side:
+        return min_size, min_size
+    width, height = size
+    scale = min(1.0, max_side / max(width, height))
+    return max(min_size, math.ceil(width * scale)), max(min_size, math.ceil(height * scale))
+
+
+def decode_rgb(content: ImageContent, min_size: int, max_pixels: int,
+               max_side: Optional[int] = None) -> Image.Image:
+    """
+    RGB-зображення, у якого обидві сторони >= min_size (якщо оригінал не менший),
+    а за max_side — довша сторона >= max_side (споживач зменшить її до max_side).
+    min_size=0 — декодування без зменшення.
+    Бюджет max_pixels перевіряється за заголовком — до виділення пам'яті під пікселі.
+    """
+    try:
+        img = Image.open(_as_file(content))
+    except Image.DecompressionBombError as e:
+        raise ImageTooLargeError(str(e)) from None
+    except UnidentifiedImageError:
+        raise ImageDecodeError("Файл не є зображенням підтримуваного формату.") from None
+    except OSError as e:
+        raise ImageDecodeError(f"Пошкоджене зображення: {e}") from None
+
+    if img.format == "JPEG" and min_size:
+        # розмір після draft — уже зменшений (декодер ще не запускався)
+        img.draft("RGB", draft_size(img.size, min_size, max_side))
+
+    width, height = img.size
+    if width * height > max_pixels:
+        raise ImageTooLargeError(
+            f"Зображення {width}x{height} перевищує ліміт {max_pixels / 1e6:g} Мп."
+        )
+    try:
+        return img.convert("RGB")
+    except OSError as e:
+        # декодер PIL повідомляє про обрізані / пошкоджені дані через OSError
+        raise ImageDecodeError(f"Пошкоджене зображення: {e}") from None
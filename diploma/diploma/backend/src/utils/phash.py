@@ -0,0 +1,30 @@
+# backend/src/utils/phash.py
+
+import cv2
+import numpy as np
+from PIL import Image
+
+
+def _gray(img: Image.Image | np.ndarray) -> np.ndarray:
+    if isinstance(img, Image.Image):
+        return np.asarray(img.convert("L"))
+    if img.ndim == 3:
+        return cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
+    return img
+
+
+def phash(img: Image.Image | np.ndarray, hash_size: int = 8, highfreq_factor: int = 4) -> int:
+    """
+    DCT perceptual hash (64 біти при hash_size=8).
+    Стійкий до перестиснення JPEG, зміни розміру та легкої корекції кольору.
+    """
+    size = hash_size * highfreq_factor
+    small = cv2.resize(_gray(img), (size, size), interpolation=cv2.INTER_AREA).astype(np.float32)
+    dct = cv2.dct(small)[:hash_size, :hash_size]
+    # DC-компонента не несе інформації про структуру — виключаємо з медіани
+    bits = (dct > np.median(dct.flatten()[1:])).flatten()
+    return int("".join("1" if b else "0" for b in bits), 2)
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
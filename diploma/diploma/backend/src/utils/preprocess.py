@@ -0,0 +1,91 @@
+# backend/src/utils/preprocess.py
+#
+# Спільний препроцесинг для всіх детекторів: зображення декодується один
+# раз у суцільний uint8-масив, далі — піраміда розмірів (покрокове
+# area-зменшення) і з неї нормалізовані тензори 224 / 512 та сірий канал.
+
+import threading
+from typing import Dict, Tuple
+
+import cv2
+import numpy as np
+import torch
+from PIL import Image
+
+# Рівні піраміди: вхід MVSSNet і вхід ViT
+PYRAMID_SIZES = (512, 224)
+
+IMAGENET_MEAN = (0.485, 0.456, 0.406)
+IMAGENET_STD = (0.229, 0.224, 0.225)
+
+# (x / 255 - mean) / std == x * scale + bias — одна операція замість ToTensor + Normalize
+_NORM_SCALE = torch.tensor([1.0 / (255.0 * s) for s in IMAGENET_STD]).view(3, 1, 1)
+_NORM_BIAS = torch.tensor([-m / s for m, s in zip(IMAGENET_MEAN, IMAGENET_STD)]).view(3, 1, 1)
+
+
+def as_rgb_array(img) -> np.ndarray:
+    """PIL-зображення або масив -> суцільний HxWx3 uint8 (без копії, якщо вже такий)."""
+    if isinstance(img, Image.Image) and img.mode != "RGB":
+        img = img.convert("RGB")
+    return np.ascontiguousarray(np.asarray(img, dtype=np.uint8))
+
+
+def resize_area(rgb: np.ndarray, size: int) -> np.ndarray:
+    """
+    Зменшення до size x size: спершу кратні 2 кроки INTER_AREA (швидкий
+    цілочисельний шлях OpenCV), потім один фінальний крок до розміру.
+    """
+    h, w = rgb.shape[:2]
+    if (h, w) == (size, size):
+        return rgb
+    while h >= 2 * size and w >= 2 * size:
+        h, w = h // 2, w // 2
+        rgb = cv2.resize(rgb, (w, h), interpolation=cv2.INTER_AREA)
+    return cv2.resize(rgb, (size, size), interpolation=cv2.INTER_AREA)
+
+
+def normalize_to_tensor(rgb: np.ndarray) -> torch.Tensor:
+    """HxWx3 uint8 -> 1x3xHxW float32, нормалізований ImageNet mean/std."""
+    x = torch.from_numpy(rgb).permute(2, 0, 1).to(torch.float32, memory_format=torch.contiguous_format)
+    return x.mul_(_NORM_SCALE).add_(_NORM_BIAS).unsqueeze(0)
+
+
+class ImagePyramid:
+    """
+    Представлення одного зображення для всіх детекторів. Рівні та тензори
+    рахуються ліниво один раз (потокобезпечно — етапи DAG паралельні);
+    менші рівні будуються з більшого стандартного рівня, а не з оригіналу.
+    """
+
+    def __init__(self, img):
+        self.rgb = as_rgb_array(img)
+        self._levels: Dict[int, np.ndarray] = {}
+        self._cache: Dict[Tuple[str, int], object] = {}
+        self._lock = threading.Lock()
+
+    def level(self, size: int) -> np.ndarray:
+        with self._lock:
+            return self._level(size)
+
+    def _level(self, size: int) -> np.ndarray:
+        if size not in self._levels:
+            # База — наступний більший стандартний рівень; порядок запитів
+            # не впливає на результат
+            larger = [s for s in PYRAMID_SIZES if s > size]
+            base = self._level(min(larger)) if larger else self.rgb
+            self._levels[size] = resize_area(base, size)
+        return self._levels[size]
+
+    def _cached(self, kind: str, size: int, fn):
+        with self._lock:
+            key = (kind, size)
+            if key not in self._cache:
+                self._cache[key] = fn(self._level(size))
+            return self._cache[key]
+
+    def tensor(self, size: int) -> torch.Tensor:
+        """Нормалізований тензор 1x3xSxS (CPU)."""
+        return self._cached("tensor", size, normalize_to_tensor)
+
+    def gray(self, size: int) -> np.ndarray:
+        return self._cached("gray", size, lambda rgb: cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY))
@@ -0,0 +1,129 @@
+# backend/src/utils/stats_rollup.py
+#
+# Інкрементальні агрегати (stats_daily / stats_user_daily) для адмін-панелі.
+# Оновлюються в тій самій транзакції, що й запис історії / реєстрація.
+# Перебудова з сирої історії (для відновлення):
+#   python -m backend.src.utils.stats_rollup
+
+from collections import defaultdict
+from datetime import date, datetime, timezone
+from typing import Any, Dict, Mapping, Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from backend.src.models.image_history import ImageHistory
+from backend.src.models.stats_rollup import FUSION_BINS, StatsDaily, StatsUserDaily
+from backend.src.models.user import User
+
+# колонка оцінки в image_history -> префікс у stats_daily
+_SCORE_PREFIXES = {
+    "ai_score": "ai",
+    "manipulation_score": "manip",
+    "patch_score": "patch",
+    "metadata_score": "meta",
+    "fusion_score": "fusion",
+}
+
+
+def rollup_day(ts: Optional[datetime]) -> date:
+    """День у UTC (наївні дати вважаються UTC)."""
+    if ts is None:
+        ts = datetime.now(timezone.utc)
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc)
+    return ts.date()
+
+
+def fusion_bucket(fusion: float) -> int:
+    return int(min(max(fusion, 0.0) * FUSION_BINS, FUSION_BINS - 1))
+
+
+def analysis_increments(scores: Mapping[str, Any]) -> Dict[str, float]:
+    inc: Dict[str, float] = {"images_count": 1}
+    for name, prefix in _SCORE_PREFIXES.items():
+        value = scores.get(name)
+        if value is None:
+            continue
+        inc[f"{prefix}_sum"] = float(value)
+        inc[f"{prefix}_count"] = 1
+
+    fusion = scores.get("fusion_score")
+    if fusion is not None:
+        fusion = float(fusion)
+        if fusion < 0.3:
+            inc["fusion_low"] = 1
+        elif fusion < 0.7:
+            inc["fusion_mid"] = 1
+        else:
+            inc["fusion_high"] = 1
+        inc[f"fusion_bin_{fusion_bucket(fusion)}"] = 1
+    return inc
+
+
+def _increment(db: Session, model, keys: Dict[str, Any], inc: Mapping[str, float]) -> None:
+    """UPDATE ... SET c = c + v; якщо рядка ще немає — INSERT (з повтором при гонці)."""
+    values = {getattr(model, col): getattr(model, col) + v for col, v in inc.items()}
+    q = db.query(model).filter_by(**keys)
+    if q.update(values, synchronize_session=False):
+        return
+    try:
+        with db.begin_nested():
+            db.add(model(**keys, **inc))
+    except IntegrityError:
+        # паралельний запит уже вставив рядок за цей день
+        q.update(values, synchronize_session=False)
+
+
+def record_analysis(db: Session, user_id: Optional[int], created_at: Optional[datetime],
+                    scores: Mapping[str, Any]) -> None:
+    day = rollup_day(created_at)
+    _increment(db, StatsDaily, {"day": day}, analysis_increments(scores))
+    if user_id is not None:
+        _increment(db, StatsUserDaily, {"day": day, "user_id": user_id}, {"images_count": 1})
+
+
+def record_registration(db: Session, created_at: Optional[datetime]) -> None:
+    _increment(db, StatsDaily, {"day": rollup_day(created_at)}, {"users_registered": 1})
+
+
+def rebuild_rollups(db: Session, batch_size: int = 2000) -> Dict[str, int]:
+    """Повністю перераховує агрегати з image_history та users."""
+    daily: Dict[date, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+    per_user: Dict[tuple, int] = defaultdict(int)
+
+    score_cols = [getattr(ImageHistory, name) for name in _SCORE_PREFIXES]
+    rows = (
+        db.query(ImageHistory.user_id, ImageHistory.created_at, *score_cols)
+        .yield_per(batch_size)
+    )
+    for row in rows:
+        day = rollup_day(row.created_at)
+        for col, v in analysis_increments({name: getattr(row, name) for name in _SCORE_PREFIXES}).items():
+            daily[day][col] += v
+        if row.user_id is not None:
+            per_user[(day, row.user_id)] += 1
+
+    for (created_at,) in db.query(User.created_at).yield_per(batch_size):
+        daily[rollup_day(created_at)]["users_registered"] += 1
+
+    db.query(StatsUserDaily).delete(synchronize_session=False)
+    db.query(StatsDaily).delete(synchronize_session=False)
+    db.bulk_insert_mappings(StatsDaily, [{"day": day, **dict(values)} for day, values in daily.items()])
+    db.bulk_insert_mappings(StatsUserDaily, [
+        {"day": day, "user_id": user_id, "images_count": count}
+        for (day, user_id), count in per_user.items()
+    ])
+    db.commit()
+    return {"days": len(daily), "user_days": len(per_user)}
+
+
+if __name__ == "__main__":
+    from backend.src.db import Base, SessionLocal, engine
+
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        print("Агрегати перебудовано:", rebuild_rollups(session))
+    finally:
+        session.close()
@@ -0,0 +1,70 @@
+# backend/src/utils/upload_store.py
+
+import os
+import tempfile
+import uuid
+from functools import lru_cache
+from pathlib import Path
+from typing import BinaryIO
+
+from backend.src.serving import config as serving_config
+
+COPY_CHUNK_BYTES = 1024 * 1024
+
+
+class UploadTooLargeError(ValueError):
+    """Файл перевищує дозволений розмір."""
+
+
+class UploadStore:
+    """
+    Сховище завантажених файлів завдань черги на диску: <root>/<ключ[:2]>/<ключ>.bin.
+    Ключ випадковий (один файл на завдання), файл видаляється після завершення
+    завдання. Вміст копіюється частинами — у пам'ять повністю не читається.
+    """
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+
+    def _path(self, key: str) -> Path:
+        if len(key) != 32 or any(c not in "0123456789abcdef" for c in key):
+            raise ValueError(f"Некоректний ключ файлу: {key!r}")
+        return self.root / key[:2] / f"{key}.bin"
+
+    def put(self, fileobj: BinaryIO, max_bytes: int) -> tuple[str, int]:
+        """Копіює потік у сховище. Повертає (ключ, розмір)."""
+        key = uuid.uuid4().hex
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        size = 0
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in iter(lambda: fileobj.read(COPY_CHUNK_BYTES), b""):
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise UploadTooLargeError(f"Файл завеликий (максимум {max_bytes // (1024 * 1024)} МБ).")
+                    f.write(chunk)
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        return key, size
+
+    def open(self, key: str) -> BinaryIO:
+        return self._path(key).open("rb")
+
+    def delete(self, key: str) -> None:
+        try:
+            self._path(key).unlink()
+        except FileNotFoundError:
+            pass
+
+    def exists(self, key: str) -> bool:
+        return self._path(key).exists()
+
+
+@lru_cache(maxsize=1)
+def get_upload_store() -> UploadStore:
+    return UploadStore(serving_config.JOB_UPLOAD_DIR)
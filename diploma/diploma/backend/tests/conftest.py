@@ -0,0 +1,45 @@
+# backend/tests/conftest.py
+#
+# Тести запускаються з будь-якого каталогу: python -m pytest backend/tests
+
+import sys
+from pathlib import Path
+
+import pytest
+import torch
+import torch.nn as nn
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+
+@pytest.fixture(scope="session")
+def random_mvss() -> nn.Module:
+    """
+    MVSSNet (eval) з випадковими вагами без чекпойнта і мережі: ImageNet-ваги
+    backbone не завантажуються; BN-статистики та alpha/beta DA-head випадкові
+    й ненульові, щоб перевірки еквівалентності справді їх зачіпали.
+    Тести, що змінюють модель, працюють з copy.deepcopy.
+    """
+    from backend.thirdparty.mvss_net.models import mvssnet
+
+    load_url = mvssnet.model_zoo.load_url
+    mvssnet.model_zoo.load_url = lambda *args, **kwargs: {}
+    try:
+        torch.manual_seed(0)
+        model = mvssnet.get_mvss(backbone="resnet50", pretrained_base=True, nclass=1,
+                                 sobel=True, constrain=True, n_input=3)
+    finally:
+        mvssnet.model_zoo.load_url = load_url
+
+    with torch.no_grad():
+        for m in model.modules():
+            if isinstance(m, nn.BatchNorm2d):
+                m.running_mean.uniform_(-0.1, 0.1)
+                m.running_var.uniform_(0.5, 1.5)
+                m.weight.data.uniform_(0.5, 1.5)
+                m.bias.data.uniform_(-0.1, 0.1)
+        model.head.pam.alpha.data.fill_(0.5)
+        model.head.cam.beta.data.fill_(0.5)
+    return model.eval()
@@ -0,0 +1,80 @@
+# backend/tests/test_early_exit.py
+#
+# Ранній вихід: межі fusion_bounds мають охоплювати fusion_predict за будь-яких
+# значень ще не обчислених оцінок, а decided() — перемикатися рівно на порозі.
+
+import math
+
+import numpy as np
+import pytest
+
+from backend.src.fusion.fusion import fusion_predict
+from backend.src.serving.early_exit import GROUP_SCORES, EarlyExitCascade, fusion_bounds
+
+SCORE_NAMES = [name for names in GROUP_SCORES.values() for name in names]
+# межі кусків fusion: площа 0.05, впевненість 0.85, поріг EXIF 0.75
+EDGE_VALUES = [0.0, 0.05, 0.0499, 0.0501, 0.75, 0.7501, 0.85, 0.8501, 1.0]
+EPS = 1e-9
+
+
+def _random_score(rng: np.random.Generator) -> float:
+    if rng.random() < 0.3:
+        return float(rng.choice(EDGE_VALUES))
+    return float(rng.random())
+
+
+def _random_known(rng: np.random.Generator) -> dict:
+    """Відомі оцінки — за довільною підмножиною груп, решта None."""
+    known = {}
+    for names in GROUP_SCORES.values():
+        known_group = rng.random() < 0.5
+        for name in names:
+            known[name] = _random_score(rng) if known_group else None
+    return known
+
+
+def test_bounds_contain_prediction():
+    rng = np.random.default_rng(0)
+    for _ in range(3000):
+        known = _random_known(rng)
+        low, high = fusion_bounds(known)
+        assert low <= high
+        for _ in range(10):
+            scores = {name: known[name] if known[name] is not None else _random_score(rng) for name in SCORE_NAMES}
+            value = fusion_predict(**scores)
+            assert low - EPS <= value <= high + EPS, (known, scores, low, high, value)
+
+
+def test_bounds_collapse_when_all_known():
+    rng = np.random.default_rng(1)
+    for _ in range(200):
+        scores = {name: _random_score(rng) for name in SCORE_NAMES}
+        low, high = fusion_bounds(scores)
+        assert low == high == fusion_predict(**scores)
+
+
+@pytest.mark.parametrize("known", [
+    {},
+    {"metadata_score": 0.9},
+    {"metadata_score": 0.2},
+    {"ai_score": 0.4},
+    {"ai_score": 0.4, "metadata_score": 0.8},
+    {"manipulation_score": 0.6, "patch_score": 0.02},
+])
+def test_decided_switches_at_threshold(known: dict):
+    low, high = fusion_bounds(known)
+    assert low < high
+
+    # нижня межа рівно на порозі — вже «підозріле», що б не дали решта детекторів
+    assert EarlyExitCascade(low).decided(known)
+    assert not EarlyExitCascade(math.nextafter(low, 1.0)).decided(known)
+    # верхня межа рівно на порозі — ще може дотягнути, не вирішено
+    assert not EarlyExitCascade(high).decided(known)
+    assert EarlyExitCascade(math.nextafter(high, 2.0)).decided(known)
+
+
+def test_decided_when_all_known():
+    known = {"ai_score": 0.3, "manipulation_score": 0.2, "patch_score": 0.1, "metadata_score": 0.0}
+    value = fusion_predict(**known)
+    for threshold in (0.0, value, math.nextafter(value, 1.0), 1.0):
+        assert EarlyExitCascade(threshold).decided(known)
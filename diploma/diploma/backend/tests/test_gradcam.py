@@ -0,0 +1,147 @@
+# backend/tests/test_gradcam.py
+#
+# ViTGradCAM (частковий backward від цільового шару) проти еталонного Grad-CAM:
+# повний forward із збереженими активаціями та scores.sum().backward().
+# Також: одночасні виклики з потоків і батч зі своїм класом для кожного зразка.
+
+import threading
+
+import pytest
+import torch
+import torch.nn.functional as F
+from timm.models.vision_transformer import VisionTransformer
+
+from backend.src.utils.gradcam import ViTGradCAM
+
+TOLERANCE = 1e-5
+THREADS = 6
+ROUNDS = 5
+IMG_SIZE, PATCH = 32, 8
+SIDE = IMG_SIZE // PATCH
+
+
+@pytest.fixture(scope="module")
+def vit() -> VisionTransformer:
+    torch.manual_seed(0)
+    model = VisionTransformer(img_size=IMG_SIZE, patch_size=PATCH, embed_dim=32, depth=3,
+                              num_heads=2, num_classes=3)
+    return model.double().eval()
+
+
+def _images(batch: int, seed: int = 0) -> torch.Tensor:
+    return torch.randn(batch, 3, IMG_SIZE, IMG_SIZE, dtype=torch.float64,
+                       generator=torch.Generator().manual_seed(seed))
+
+
+def _reference_cam(model, target_layer, x, class_idx):
+    """Класичний Grad-CAM: активації шару з retain_grad, backward від суми оцінок."""
+    captured = {}
+
+    def hook(module, inputs, output):
+        output.retain_grad()
+        captured["acts"] = output
+
+    handle = target_layer.register_forward_hook(hook)
+    try:
+        logits = model(x)
+    finally:
+        handle.remove()
+    if class_idx is None:
+        class_idx = logits.argmax(dim=1)
+    class_idx = torch.as_tensor(class_idx).reshape(-1).expand(x.size(0))
+    scores = logits[torch.arange(x.size(0)), class_idx]
+    scores.sum().backward()
+    model.zero_grad(set_to_none=True)
+
+    importance = captured["acts"].grad[:, 1:, :].abs().mean(dim=2)
+    cam = F.relu(importance.view(x.size(0), 1, SIDE, SIDE))
+    flat = cam.flatten(1)
+    low = flat.min(dim=1)[0].view(-1, 1, 1, 1)
+    high = flat.max(dim=1)[0].view(-1, 1, 1, 1)
+    return (cam - low) / (high - low + 1e-8), logits.detach()
+
+
+def _target_layers(model):
+    # norm1 блоків — частковий forward; сам блок — шлях через forward-хук
+    return {
+        "first_norm1": model.blocks[0].norm1,
+        "last_norm1": model.blocks[-1].norm1,
+        "middle_block": model.blocks[1],
+    }
+
+
+@pytest.mark.parametrize("layer", ["first_norm1", "last_norm1", "middle_block"])
+@pytest.mark.parametrize("class_idx", [None, 1])
+def test_partial_backward_matches_full_backward(vit, layer: str, class_idx):
+    target = _target_layers(vit)[layer]
+    x = _images(3)
+
+    cam_model = ViTGradCAM(vit, target, num_patches_side=SIDE)
+    try:
+        cam, logits = cam_model(x, class_idx)
+    finally:
+        cam_model.close()
+
+    # частковий backward не залишає градієнтів у параметрах
+    assert all(p.grad is None for p in vit.parameters())
+
+    ref_cam, ref_logits = _reference_cam(vit, target, x, class_idx)
+    assert cam.shape == (3, 1, SIDE, SIDE)
+    torch.testing.assert_close(logits, ref_logits, atol=TOLERANCE, rtol=TOLERANCE)
+    torch.testing.assert_close(cam, ref_cam, atol=TOLERANCE, rtol=TOLERANCE)
+
+
+@pytest.mark.parametrize("layer", ["last_norm1", "middle_block"])
+def test_concurrent_calls_match_sequential(vit, layer: str):
+    """Один екземпляр з кількох потоків одночасно: кожен результат — як у послідовному виклику."""
+    cam_model = ViTGradCAM(vit, _target_layers(vit)[layer], num_patches_side=SIDE)
+    inputs = [_images(1 + i % 3, seed=10 + i) for i in range(THREADS)]
+    try:
+        expected = [cam_model(x) for x in inputs]
+
+        barrier = threading.Barrier(THREADS)
+        results: dict = {}
+        errors: list = []
+
+        def worker(i: int) -> None:
+            try:
+                barrier.wait()
+                results[i] = [cam_model(inputs[i]) for _ in range(ROUNDS)]
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(THREADS)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        cam_model.close()
+
+    assert not errors
+    for i, (ref_cam, ref_logits) in enumerate(expected):
+        for cam, logits in results[i]:
+            torch.testing.assert_close(cam, ref_cam, atol=TOLERANCE, rtol=TOLERANCE)
+            torch.testing.assert_close(logits, ref_logits, atol=TOLERANCE, rtol=TOLERANCE)
+    assert all(p.grad is None for p in vit.parameters())
+
+
+@pytest.mark.parametrize("layer", ["last_norm1", "middle_block"])
+def test_mixed_class_idx_matches_single_calls(vit, layer: str):
+    cam_model = ViTGradCAM(vit, _target_layers(vit)[layer], num_patches_side=SIDE)
+    x = _images(4, seed=3)
+    class_idx = [2, 0, 1, 2]
+    try:
+        cam, logits = cam_model(x, class_idx)
+        singles = [cam_model(x[i:i + 1], class_idx[i]) for i in range(len(class_idx))]
+        with pytest.raises(ValueError):
+            cam_model(x, class_idx[:3])
+    finally:
+        cam_model.close()
+
+    for i, (single_cam, single_logits) in enumerate(singles):
+        torch.testing.assert_close(cam[i:i + 1], single_cam, atol=TOLERANCE, rtol=TOLERANCE)
+        torch.testing.assert_close(logits[i:i + 1], single_logits, atol=TOLERANCE, rtol=TOLERANCE)
+    # класи справді різні: CAM зразка залежить від вибраного класу
+    other, _ = _reference_cam(vit, _target_layers(vit)[layer], x[:1], 1)
+    assert not torch.allclose(cam[:1], other, atol=1e-3)
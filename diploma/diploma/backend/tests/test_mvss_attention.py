@@ -0,0 +1,53 @@
+# backend/tests/test_mvss_attention.py
+#
+# Блокова position attention DA-head MVSS (attention_block_size) проти
+# повної матриці HW x HW: вихід і градієнти (вхід + ваги) на випадкових картах.
+
+import copy
+
+import pytest
+import torch
+
+from backend.thirdparty.mvss_net.models.mvssnet import _PositionAttentionModule
+
+TOLERANCE = 1e-5
+CHANNELS = 32
+HEIGHT, WIDTH = 6, 7  # HW = 42
+
+
+def _module() -> _PositionAttentionModule:
+    torch.manual_seed(0)
+    module = _PositionAttentionModule(CHANNELS).double()
+    with torch.no_grad():
+        module.alpha.fill_(0.7)  # з нульовою alpha attention не впливає на вихід
+    return module
+
+
+def _run(module: _PositionAttentionModule, x: torch.Tensor):
+    x = x.clone().requires_grad_(True)
+    out = module(x)
+    # ненульовий «градієнт виходу», щоб перевірка не зводилась до суми
+    weight = torch.linspace(-1.0, 1.0, out.numel(), dtype=out.dtype).view_as(out)
+    (out * weight).sum().backward()
+    grads = {name: p.grad.clone() for name, p in module.named_parameters()}
+    return out.detach(), x.grad, grads
+
+
+# 1 і 5 не ділять HW=42; 42 і 100 — один блок (гілка повної матриці)
+@pytest.mark.parametrize("block", [1, 5, 8, 21, 41, 42, 100])
+def test_block_attention_matches_full(block: int):
+    reference = _module()
+    x = torch.randn(2, CHANNELS, HEIGHT, WIDTH, dtype=torch.float64, generator=torch.Generator().manual_seed(1))
+    ref_out, ref_x_grad, ref_grads = _run(reference, x)
+
+    blocked = copy.deepcopy(reference)
+    blocked.zero_grad(set_to_none=True)
+    blocked.attention_block_size = block
+    out, x_grad, grads = _run(blocked, x)
+
+    torch.testing.assert_close(out, ref_out, atol=TOLERANCE, rtol=TOLERANCE)
+    torch.testing.assert_close(x_grad, ref_x_grad, atol=TOLERANCE, rtol=TOLERANCE)
+    assert grads.keys() == ref_grads.keys()
+    for name in ref_grads:
+        torch.testing.assert_close(grads[name], ref_grads[name], atol=TOLERANCE, rtol=TOLERANCE, msg=name)
+
@@ -0,0 +1,70 @@
+# backend/tests/test_mvss_inference.py
+#
+# Еквівалентність MVSSNetInference (без гілки Sobel/ERB, BN згорнуто в conv)
+# оригінальному forward MVSSNet.
+#
+# Згортка BN точна з точністю до округлення, тому повна модель порівнюється
+# у float64. У float32 випадкова (ненавчена) ResNet-50 сама по собі
+# розходиться з float64 на ~1e-4, тож на рівні float32 перевіряється
+# кожен згорнутий блок (Bottleneck, послідовності DA-head) окремо.
+
+import copy
+from pathlib import Path
+
+import pytest
+import torch
+import torch.nn as nn
+
+from backend.src.models.mvss_inference import (
+    MVSSNetInference,
+    _fold_bottleneck,
+    _fold_sequential,
+    max_relative_error,
+)
+from backend.thirdparty.mvss_net.models import mvssnet
+
+FLOAT64_TOLERANCE = 1e-10
+FLOAT32_TOLERANCE = 1e-5
+CHECKPOINT = Path(__file__).resolve().parents[1] / "thirdparty" / "mvss_net" / "ckpt" / "mvssnetplus_casia.pt"
+
+
+@pytest.fixture(scope="module")
+def reference(random_mvss) -> nn.Module:
+    return random_mvss
+
+
+def test_folded_model_matches_original_float64(reference):
+    reference = copy.deepcopy(reference).double()
+    optimized = MVSSNetInference(copy.deepcopy(reference))
+    x = torch.randn(2, 3, 128, 128, dtype=torch.float64, generator=torch.Generator().manual_seed(1))
+    assert max_relative_error(reference, optimized, x) < FLOAT64_TOLERANCE
+
+
+def test_each_folded_block_matches_float32(reference):
+    reference = copy.deepcopy(reference)
+    blocks = [m for m in reference.modules() if isinstance(m, mvssnet.Bottleneck)]
+    x_gen = torch.Generator().manual_seed(2)
+    with torch.no_grad():
+        for block in blocks:
+            x = torch.randn(1, block.conv1.in_channels, 16, 16, generator=x_gen)
+            expected = block(x)
+            _fold_bottleneck(block)
+            actual = block(x)
+            assert ((expected - actual).abs().max() / expected.abs().max()).item() < FLOAT32_TOLERANCE
+
+        for seq in (reference.head.conv_p1, reference.head.conv_c1, reference.head.conv_p2, reference.head.conv_c2):
+            x = torch.randn(1, seq[0].in_channels, 16, 16, generator=x_gen)
+            expected = seq(x)
+            _fold_sequential(seq)
+            actual = seq(x)
+            assert ((expected - actual).abs().max() / expected.abs().max()).item() < FLOAT32_TOLERANCE
+
+
+@pytest.mark.skipif(not CHECKPOINT.is_file(), reason="чекпойнт MVSSNet відсутній")
+def test_folded_checkpoint_matches_float32():
+    from backend.src.models.mvss_manip import load_mvss_model
+
+    reference = load_mvss_model(str(CHECKPOINT), optimized=False, backend="torch").cpu().eval()
+    optimized = MVSSNetInference(copy.deepcopy(reference))
+    x = torch.randn(2, 3, 512, 512, generator=torch.Generator().manual_seed(3))
+    assert max_relative_error(reference, optimized, x) < FLOAT32_TOLERANCE
@@ -0,0 +1,71 @@
+# backend/tests/test_mvss_scoring.py
+#
+# Пакетні оцінки MVSS (варіанти torch і NumPy) проти еталонного
+# refined_score_np на масках із вклейками різної площі.
+
+import numpy as np
+import pytest
+import torch
+
+from backend.src.models.mvss_scoring import (
+    refined_score_np,
+    score_batch_np,
+    score_batch_torch,
+    score_mask_batch,
+)
+
+TOLERANCE = 1e-6
+SIZE = 128
+
+
+def _masks() -> torch.Tensor:
+    """Шум нижче порогу + прямокутні вклейки: нуль, мала площа, нормальна, > MAX_AREA_RATIO, на краю."""
+    rng = np.random.default_rng(0)
+    masks = rng.uniform(0.0, 0.45, size=(6, 1, SIZE, SIZE)).astype(np.float32)
+    for i, (y, x, h, w) in enumerate([(0, 0, 0, 0), (60, 60, 3, 3), (20, 30, 40, 25),
+                                      (0, 0, 90, 90), (0, 100, 30, 28), (10, 10, 1, 50)]):
+        masks[i, 0, y:y + h, x:x + w] = rng.uniform(0.55, 1.0, size=(h, w))
+    return torch.from_numpy(masks)
+
+
+def _suppression() -> torch.Tensor:
+    supp = np.ones((6, 1, SIZE // 2, SIZE // 2), np.float32)
+    supp[2, 0, 10:30, 15:40] = 0.0
+    return torch.from_numpy(supp)
+
+
+def _reference(masks: torch.Tensor):
+    heatmaps = masks[:, 0].numpy()
+    return [refined_score_np(m) for m in heatmaps], [float(np.mean(m)) for m in heatmaps]
+
+
+@pytest.mark.parametrize("score_fn", [score_batch_np, score_batch_torch])
+def test_batch_scores_match_reference(score_fn):
+    masks = _masks()
+    expected_scores, expected_patch = _reference(masks)
+    assert any(s > 0 for s in expected_scores) and any(s == 0 for s in expected_scores)
+
+    scores, patch_scores, heatmaps = score_fn(masks[:, 0].clone())
+    np.testing.assert_allclose(scores, expected_scores, rtol=0, atol=TOLERANCE)
+    np.testing.assert_allclose(patch_scores, expected_patch, rtol=0, atol=TOLERANCE)
+    np.testing.assert_array_equal(heatmaps, masks[:, 0].numpy())
+
+
+def test_suppression_is_applied_before_scoring():
+    masks, supp = _masks(), _suppression()
+    scores, _, heatmaps = score_mask_batch(masks, supp)
+
+    full_supp = torch.nn.functional.interpolate(supp, size=(SIZE, SIZE), mode="nearest")
+    expected_scores, _ = _reference(masks * full_supp)
+    np.testing.assert_allclose(scores, expected_scores, rtol=0, atol=TOLERANCE)
+    assert heatmaps[2, 20:60, 30:80].max() == 0.0
+
+
+@pytest.mark.skipif(not torch.cuda.is_available(), reason="CUDA недоступна")
+def test_gpu_path_matches_cpu_path():
+    masks, supp = _masks(), _suppression()
+    cpu = score_mask_batch(masks, supp)
+    gpu = score_mask_batch(masks.cuda(), supp.cuda())
+    np.testing.assert_allclose(gpu[0], cpu[0], rtol=0, atol=TOLERANCE)
+    np.testing.assert_allclose(gpu[1], cpu[1], rtol=0, atol=TOLERANCE)
+    np.testing.assert_allclose(gpu[2], cpu[2], rtol=0, atol=TOLERANCE)
@@ -0,0 +1,60 @@
+# backend/tests/test_near_duplicate.py
+#
+# Індекс майже-дублікатів: обмеження розміру, видалення разом із кешем результатів.
+
+from backend.src.serving.near_duplicate import NearDuplicateIndex
+from backend.src.serving.result_cache import ResultCache
+
+
+def _h(i: int) -> int:
+    """Хеші, попарно віддалені щонайменше на 16 біт (радіус індексу — 2)."""
+    return int.from_bytes(bytes([0x11 * i]) * 8, "big")
+
+
+def _index(tmp_path, max_entries: int = 0) -> NearDuplicateIndex:
+    return NearDuplicateIndex("test", version="v1", radius=2, disk_path=str(tmp_path / "cache.sqlite3"),
+                              max_entries=max_entries)
+
+
+def test_oldest_entries_are_evicted(tmp_path):
+    index = _index(tmp_path, max_entries=3)
+    for i in range(5):
+        index.add(_h(i), f"k{i}")
+    assert index.lookup(_h(0)) == []
+    assert index.lookup(_h(4)) == [(0, "k4")]
+    assert index.stats()["indexed"] == 3
+
+    reopened = _index(tmp_path, max_entries=2)
+    assert [reopened.lookup(_h(i)) != [] for i in range(5)] == [False, False, False, True, True]
+
+
+def test_removed_keys_are_not_found_and_tree_is_rebuilt(tmp_path):
+    index = _index(tmp_path)
+    for i in range(4):
+        index.add(_h(i), f"k{i}")
+    index.remove(["k0", "k1", "k2"])
+    assert index.lookup(_h(0)) == []
+    assert index.lookup(_h(3)) == [(0, "k3")]
+    stats = index.stats()
+    assert stats["rebuilds"] == 1 and stats["tree_nodes"] == 1
+    assert _index(tmp_path).stats()["indexed"] == 1
+
+
+def test_readded_key_matches_only_its_new_hash(tmp_path):
+    index = _index(tmp_path)
+    index.add(_h(0), "k")
+    index.add(_h(1), "k")
+    assert index.lookup(_h(0)) == []
+    assert index.lookup(_h(1)) == [(0, "k")]
+
+
+def test_index_is_pruned_with_result_cache(tmp_path):
+    cache = ResultCache("test", version="v1", memory_bytes=0, disk_path=str(tmp_path / "cache.sqlite3"),
+                        disk_bytes=2500, encode=bytes, decode=bytes)
+    index = _index(tmp_path)
+    cache.add_evict_listener(index.remove)
+    for i in range(4):
+        key = cache.key(f"h{i}")
+        cache.put(key, b"x" * 1000)
+        index.add(_h(i), key)
+    assert [index.lookup(_h(i)) != [] for i in range(4)] == [False, False, True, True]
@@ -0,0 +1,34 @@
+# backend/tests/test_onnx_export.py
+#
+# Паритет ONNX Runtime з torch для експорту backend/training/export_onnx.py
+# (ViT і інференс-версія MVSSNet з випадковими вагами, динамічна вісь батчу).
+
+import copy
+
+import pytest
+
+pytest.importorskip("onnx")
+pytest.importorskip("onnxruntime")
+
+from backend.src.models.ai_detector import build_ai_vit  # noqa: E402
+from backend.src.models.mvss_inference import MVSSNetInference  # noqa: E402
+from backend.src.models.mvss_manip import MVSS_INPUT_SIZE  # noqa: E402
+from backend.src.serving.onnx_runtime import MVSS_ONNX_FILE, VIT_ONNX_FILE, OnnxModel  # noqa: E402
+from backend.training.export_onnx import VIT_INPUT_SIZE, check_parity, export, parity_images  # noqa: E402
+
+PARITY_BATCH = 3
+
+
+def test_exported_models_match_torch(tmp_path, random_mvss):
+    vit = build_ai_vit(num_classes=2, pretrained=False, freeze_backbone=False).eval()
+    mvss = MVSSNetInference(copy.deepcopy(random_mvss)).eval()
+
+    export(vit, VIT_INPUT_SIZE, tmp_path / VIT_ONNX_FILE, "logits")
+    export(mvss, MVSS_INPUT_SIZE, tmp_path / MVSS_ONNX_FILE, "mask")
+
+    # Батч більший за 1 перевіряє динамічну вісь, з якою експортовано моделі
+    assert check_parity(
+        vit, OnnxModel(tmp_path / VIT_ONNX_FILE),
+        mvss, OnnxModel(tmp_path / MVSS_ONNX_FILE),
+        parity_images(None)[:PARITY_BATCH],
+    )
@@ -0,0 +1,45 @@
+# backend/tests/test_result_cache.py
+#
+# Дисковий рівень ResultCache: обмеження обсягу з витісненням найстаріших записів.
+
+from backend.src.serving.result_cache import ResultCache
+
+RECORD = b"x" * 1000
+
+
+def _cache(tmp_path, disk_bytes: int, version: str = "v1") -> ResultCache:
+    return ResultCache(
+        "test", version=version, memory_bytes=0, disk_path=str(tmp_path / "cache.sqlite3"),
+        disk_bytes=disk_bytes, encode=bytes, decode=bytes,
+    )
+
+
+def test_disk_tier_evicts_oldest_records(tmp_path):
+    cache = _cache(tmp_path, disk_bytes=3500)
+    keys = [cache.key(f"h{i}") for i in range(5)]
+    for key in keys:
+        cache.put(key, RECORD)
+
+    assert cache.stats()["disk_bytes"] <= 3500
+    assert [cache.get(key)[0] is not None for key in keys] == [False, False, True, True, True]
+    assert cache.stats()["disk_evictions"] == 2
+
+
+def test_replacing_a_record_does_not_double_count(tmp_path):
+    cache = _cache(tmp_path, disk_bytes=3500)
+    for _ in range(5):
+        cache.put(cache.key("same"), RECORD)
+    assert cache.stats()["disk_bytes"] == len(RECORD)
+    assert cache.stats()["disk_evictions"] == 0
+
+
+def test_limit_is_applied_on_reopen(tmp_path):
+    cache = _cache(tmp_path, disk_bytes=0)
+    for i in range(5):
+        cache.put(cache.key(f"h{i}"), RECORD)
+    assert cache.stats()["disk_bytes"] == 5 * len(RECORD)
+
+    reopened = _cache(tmp_path, disk_bytes=2000)
+    assert reopened.stats()["disk_bytes"] == 2000
+    assert reopened.get(reopened.key("h4"))[0] == RECORD
+    assert reopened.get(reopened.key("h0"))[1] is None
@@ -358,21 +358,35 @@ class MVSSNet(ResNet50):
 class _PositionAttentionModule(nn.Module):
     """ Position attention module"""
 
-    def __init__(self, in_channels, **kwargs):
+    def __init__(self, in_channels, attention_block_size=None, **kwargs):
         super(_PositionAttentionModule, self).__init__()
         self.conv_b = nn.Conv2d(in_channels, in_channels // 8, 1)
         self.conv_c = nn.Conv2d(in_channels, in_channels // 8, 1)
         self.conv_d = nn.Conv2d(in_channels, in_channels, 1)
         self.alpha = nn.Parameter(torch.zeros(1))
         self.softmax = nn.Softmax(dim=-1)
+        # Queries per block: the attention matrix is built as (block x HW)
+        # slices instead of one (HW x HW) matrix. None / 0 - the full matrix.
+        self.attention_block_size = attention_block_size
 
     def forward(self, x):
         batch_size, _, height, width = x.size()
         feat_b = self.conv_b(x).view(batch_size, -1, height * width).permute(0, 2, 1)
         feat_c = self.conv_c(x).view(batch_size, -1, height * width)
-        attention_s = self.softmax(torch.bmm(feat_b, feat_c))
         feat_d = self.conv_d(x).view(batch_size, -1, height * width)
-        feat_e = torch.bmm(feat_d, attention_s.permute(0, 2, 1)).view(batch_size, -1, height, width)
+
+        block = self.attention_block_size
+        if not block or block >= height * width:
+            attention_s = self.softmax(torch.bmm(feat_b, feat_c))
+            feat_e = torch.bmm(feat_d, attention_s.permute(0, 2, 1))
+        else:
+            # softmax is row-wise over keys, so each query block is exact on its own
+            feat_e = feat_d.new_empty(feat_d.shape)
+            for start in range(0, height * width, block):
+                attention_s = self.softmax(torch.bmm(feat_b[:, start:start + block], feat_c))
+                feat_e[:, :, start:start + block] = torch.bmm(feat_d, attention_s.permute(0, 2, 1))
+
+        feat_e = feat_e.view(batch_size, -1, height, width)
         out = self.alpha * feat_e + x
 
         return out
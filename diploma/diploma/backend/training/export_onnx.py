@@ -0,0 +1,130 @@
+# backend/training/export_onnx.py
+#
+# Експорт ViT (AI-детектор) та інференс-версії MVSSNet в ONNX з динамічною
+# віссю батчу і перевірка паритету ONNX Runtime з torch на фіксованому
+# наборі зображень (оцінки AI, оцінки та маски MVSS).
+#
+#   python -m backend.training.export_onnx [--images DIR] [--check-only]
+#
+# Результат — у ONNX_MODELS_DIR (див. serving/config.py); сервіс підхоплює
+# моделі за INFERENCE_BACKEND=onnx.
+
+import argparse
+import glob
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import torch
+from PIL import Image
+
+from backend.src.models.ai_detector import build_ai_vit
+from backend.src.models.mvss_manip import MVSS_INPUT_SIZE, load_mvss_model, predict_mvss_batch
+from backend.src.serving import config as serving_config
+from backend.src.serving.onnx_runtime import MVSS_ONNX_FILE, VIT_ONNX_FILE, OnnxModel
+from backend.src.utils.preprocess import ImagePyramid
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+VIT_WEIGHTS = ROOT_DIR / "models" / "ai_vit_b16.pt"
+MVSS_CHECKPOINT = ROOT_DIR / "thirdparty" / "mvss_net" / "ckpt" / "mvssnetplus_casia.pt"
+
+OPSET = 17
+VIT_INPUT_SIZE = 224
+AI_POS_IDX = 0
+
+# Допуски паритету: ймовірності / оцінки та попіксельна маска MVSS
+SCORE_TOLERANCE = 1e-3
+MASK_TOLERANCE = 1e-2
+PARITY_IMAGES = 8
+
+
+def export(model, size: int, path: Path, output_name: str) -> None:
+    dummy = torch.randn(1, 3, size, size)
+    torch.onnx.export(
+        model,
+        (dummy,),
+        str(path),
+        input_names=["input"],
+        output_names=[output_name],
+        dynamic_axes={"input": {0: "batch"}, output_name: {0: "batch"}},
+        opset_version=OPSET,
+        do_constant_folding=True,
+        dynamo=False,
+    )
+    print(f"Збережено: {path} ({path.stat().st_size / 1e6:.1f} МБ)")
+
+
+def parity_images(images_dir: str | None) -> list[np.ndarray]:
+    """Фіксований набір: перші PARITY_IMAGES файлів каталогу або детерміновані синтетичні зображення."""
+    if images_dir:
+        paths = sorted(glob.glob(os.path.join(images_dir, "*.*")))[:PARITY_IMAGES]
+        return [np.asarray(Image.open(p).convert("RGB")) for p in paths]
+
+    rng = np.random.default_rng(0)
+    images = []
+    for i in range(PARITY_IMAGES):
+        h, w = 480 + 32 * i, 640 - 24 * i
+        yy, xx = np.mgrid[0:h, 0:w]
+        base = np.stack([xx * 255 // w, yy * 255 // h, (xx + yy) * 255 // (h + w)], axis=-1)
+        noise = rng.integers(-20, 21, size=(h, w, 3))
+        images.append(np.clip(base + noise, 0, 255).astype(np.uint8))
+    return images
+
+
+def check_parity(vit, vit_onnx, mvss, mvss_onnx, images: list[np.ndarray]) -> bool:
+    pyramids = [ImagePyramid(img) for img in images]
+
+    x = torch.cat([p.tensor(VIT_INPUT_SIZE) for p in pyramids])
+    with torch.inference_mode():
+        ai_torch = torch.softmax(vit(x), dim=1)[:, AI_POS_IDX]
+        ai_onnx = torch.softmax(vit_onnx(x), dim=1)[:, AI_POS_IDX]
+    ai_diff = (ai_torch - ai_onnx).abs().max().item()
+
+    # Маски облич спільні для обох бекендів — порівнюється лише модель
+    masks = [np.ones((MVSS_INPUT_SIZE, MVSS_INPUT_SIZE), np.float32)] * len(pyramids)
+    ref = predict_mvss_batch(mvss, pyramids, masks)
+    out = predict_mvss_batch(mvss_onnx, pyramids, masks)
+    manip_diff = max(abs(a["manipulation_score"] - b["manipulation_score"]) for a, b in zip(ref, out))
+    patch_diff = max(abs(a["patch_score"] - b["patch_score"]) for a, b in zip(ref, out))
+    mask_diff = max(float(np.abs(a["manip_heatmap"] - b["manip_heatmap"]).max()) for a, b in zip(ref, out))
+
+    print(f"Зображень: {len(images)}")
+    print(f"  ai_score            max |Δ| = {ai_diff:.2e}")
+    print(f"  manipulation_score  max |Δ| = {manip_diff:.2e}")
+    print(f"  patch_score         max |Δ| = {patch_diff:.2e}")
+    print(f"  маска MVSS          max |Δ| = {mask_diff:.2e}")
+    return (ai_diff <= SCORE_TOLERANCE and manip_diff <= SCORE_TOLERANCE
+            and patch_diff <= SCORE_TOLERANCE and mask_diff <= MASK_TOLERANCE)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Експорт ViT та MVSSNet в ONNX і перевірка паритету з torch")
+    parser.add_argument("--out-dir", default=serving_config.ONNX_MODELS_DIR)
+    parser.add_argument("--images", default=None, help="каталог зображень для перевірки паритету")
+    parser.add_argument("--check-only", action="store_true", help="лише перевірити вже експортовані моделі")
+    args = parser.parse_args()
+
+    out_dir = Path(args.out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    vit = build_ai_vit(num_classes=2, pretrained=False, freeze_backbone=False)
+    vit.load_state_dict(torch.load(VIT_WEIGHTS, map_location="cpu"))
+    vit.eval()
+    mvss = load_mvss_model(str(MVSS_CHECKPOINT), optimized=True, backend="torch").cpu().eval()
+
+    if not args.check_only:
+        export(vit, VIT_INPUT_SIZE, out_dir / VIT_ONNX_FILE, "logits")
+        export(mvss, MVSS_INPUT_SIZE, out_dir / MVSS_ONNX_FILE, "mask")
+
+    ok = check_parity(
+        vit, OnnxModel(out_dir / VIT_ONNX_FILE),
+        mvss, OnnxModel(out_dir / MVSS_ONNX_FILE),
+        parity_images(args.images),
+    )
+    print("Паритет: OK" if ok else "Паритет: розбіжність перевищує допуск")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -25,7 +25,8 @@ const postFile = (url, file) => {
     });
 };
 
-export const analyzeAll = (file) => postFile("/analyze_full", file);
+// Канвас heatmap має 256x256 — більша роздільність лише збільшує відповідь
+export const analyzeAll = (file) => postFile("/analyze_full?heatmap_size=256", file);
 
 export const fetchHistory = () =>
     axiosInstance.get("/history/me");